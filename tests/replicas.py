@@ -0,0 +1,162 @@
+"""
+Runs many replicas of the simulation of a test in parallel, for example:
+
+    python replicas.py test7 --replicas 8 --seed 42 --time 100000 --workers 4
+
+Every replica runs main(simulated_time) of the testX.py script in its own worker process and its own results folder
+<out>/<variant>_<replica>, so the Results.csv and Results_link.csv files of the replicas do not overwrite each other.
+The RANDOM_SEED of each replica is derived from the master seed and the replica, so the runs are different between
+them and can be repeated. With --variants a JSON file with a list of dictionaries is read, each variant overrides
+"simulated_time" and the module variables of the script it names, and is run --replicas times
+
+The manifest.json file of the out folder lists every replica with its seed, variant, folder, result files and status,
+load_manifest reads it to process the results of all the replicas
+
+It uses the same python2.7 and YAFS environment as the simulation scripts
+"""
+from __future__ import print_function
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+
+def replica_seed(master_seed, replica):
+    """
+    Returns the seed of a replica, a 32-bit integer taken from the hash of the master seed and the replica name
+    """
+    digest = hashlib.sha256(("%s:%s" % (master_seed, replica)).encode()).hexdigest()
+    return int(digest[:8], 16)
+
+
+def replica_tasks(test, out, replicas, master_seed, simulated_time, variants=None):
+    """
+    Returns the description of every replica to run: the replicas of each variant of the test
+    """
+    test_dir = os.path.abspath(test)
+    if variants is None:
+        variants = [{}]
+
+    tasks = []
+    for v, variant in enumerate(variants):
+        for r in range(replicas):
+            name = "%d_%d" % (v, r)
+            tasks.append({"replica": name,
+                          "test": os.path.basename(test_dir),
+                          "test_dir": test_dir,
+                          "variant": variant,
+                          "seed": replica_seed(master_seed, name),
+                          "simulated_time": variant.get("simulated_time", simulated_time),
+                          "results_dir": os.path.abspath(os.path.join(out, name))})
+    return tasks
+
+
+def run_replica(task):
+    """
+    Runs one replica in the current worker process, which is only used for this replica
+    Returns the entry of the replica in the manifest
+    """
+    entry = dict(task)
+    start = time.time()
+    try:
+        if not os.path.exists(task["results_dir"]):
+            os.makedirs(task["results_dir"])
+        # The script writes its results and the drawn topology in the working directory
+        os.chdir(task["results_dir"])
+        logging.basicConfig(level=logging.WARNING, filename="replica.log")
+
+        sys.path.insert(0, task["test_dir"])
+        module = importlib.import_module(task["test"])
+        for name, value in task["variant"].items():
+            if name != "simulated_time":
+                setattr(module, name, value)
+        module.RANDOM_SEED = task["seed"]
+
+        module.main(simulated_time=task["simulated_time"])
+
+        entry["status"] = "ok"
+    except Exception:
+        entry["status"] = "failed"
+        entry["error"] = traceback.format_exc()
+
+    entry["elapsed"] = time.time() - start
+    entry["results"] = os.path.join(task["results_dir"], "Results.csv")
+    entry["results_link"] = os.path.join(task["results_dir"], "Results_link.csv")
+    return entry
+
+
+def save_manifest(out, master_seed, entries):
+    with open(os.path.join(out, "manifest.json"), "w") as f:
+        json.dump({"master_seed": master_seed,
+                   "replicas": sorted(entries, key=lambda entry: entry["replica"])}, f, indent=2)
+
+
+def run_replicas(test, out, replicas, master_seed, simulated_time, variants=None, workers=None):
+    """
+    Runs all the replicas in a pool of workers and writes the manifest, it is updated after every finished replica
+    Returns the entries of the manifest
+    """
+    if not os.path.exists(out):
+        os.makedirs(out)
+    tasks = replica_tasks(test, out, replicas, master_seed, simulated_time, variants)
+
+    entries = []
+    # Every replica gets a new process, the scripts keep their state in module variables
+    pool = multiprocessing.Pool(workers, maxtasksperchild=1)
+    try:
+        for entry in pool.imap_unordered(run_replica, tasks):
+            entries.append(entry)
+            save_manifest(out, master_seed, entries)
+            print("%d/%d replica %s %s in %.1f s" % (len(entries), len(tasks), entry["replica"], entry["status"],
+                                                     entry["elapsed"]))
+    finally:
+        pool.close()
+        pool.join()
+
+    return entries
+
+
+def load_manifest(out, status="ok"):
+    """
+    Returns the entries of the replicas of a manifest, only the ones with the status given (all of them with None)
+    """
+    with open(os.path.join(out, "manifest.json")) as f:
+        replicas = json.load(f)["replicas"]
+    return [entry for entry in replicas if status is None or entry["status"] == status]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs replicas of the simulation of a test in parallel")
+    parser.add_argument("test", help="folder of the test, its testX.py script is run")
+    parser.add_argument("--replicas", type=int, default=4, help="replicas of every variant")
+    parser.add_argument("--seed", type=int, default=0, help="master seed the seeds of the replicas are derived from")
+    parser.add_argument("--time", type=int, default=None, help="simulated time, by default the one of parameters.py")
+    parser.add_argument("--variants", default=None, help="JSON file with the list of variants")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, by default one per core")
+    parser.add_argument("--out", default=None, help="folder of the results, by default runs/<test>")
+    args = parser.parse_args()
+
+    test = args.test.rstrip("/\\")
+    simulated_time = args.time
+    if simulated_time is None:
+        sys.path.insert(0, os.path.abspath(test))
+        from parameters import Parameters
+        simulated_time = Parameters().simulation_time
+
+    variants = None
+    if args.variants is not None:
+        with open(args.variants) as f:
+            variants = json.load(f)
+
+    out = args.out if args.out is not None else os.path.join("runs", os.path.basename(test))
+    entries = run_replicas(test, out, args.replicas, args.seed, simulated_time, variants, args.workers)
+
+    failed = [entry["replica"] for entry in entries if entry["status"] != "ok"]
+    print("%d replicas in %s, %d failed %s" % (len(entries), out, len(failed), failed if failed else ""))
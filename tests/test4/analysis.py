@@ -3,6 +3,7 @@ import tensorflow as tf
 
 from parameters import Parameters
 from functions import ts_memory, univariate_data, ms_val, avg_pred, line_plot
+from pipeline import window_dataset, measure_throughput, StepsPerSecond
 
 # import parameters
 param = Parameters()
@@ -51,26 +52,27 @@ ts_data = (ts_data-ts_data_mean) / ts_data_std
 univariate_past_history = 150
 univariate_future_target = 5
 
-x_train, y_train = univariate_data(ts_data, 0, TRAIN_SPLIT,
-                                           univariate_past_history,
-                                           univariate_future_target)
 x_val, y_val = univariate_data(ts_data, TRAIN_SPLIT, None,
                                        univariate_past_history,
                                        univariate_future_target)
 
-# show_plot([x_train[0], y_train[0]], univariate_future_target, 'Sample Example')
+# show_plot([x_val[0], y_val[0]], univariate_future_target, 'Sample Example')
 
 BATCH_SIZE = 100
-# BUFFER_SIZE = 10000
+BUFFER_SIZE = 10000
 
-train_univariate = tf.data.Dataset.from_tensor_slices((x_train, y_train))
-train_univariate = train_univariate.cache().batch(BATCH_SIZE).repeat()
+# The windows are gathered from the series when each batch is requested
+train_univariate = window_dataset(ts_data.values, 0, TRAIN_SPLIT, univariate_past_history,
+                                  univariate_future_target, batch_size=BATCH_SIZE, shuffle_buffer=BUFFER_SIZE,
+                                  seed=13, repeat=True)
 
-val_univariate = tf.data.Dataset.from_tensor_slices((x_val, y_val))
-val_univariate = val_univariate.batch(BATCH_SIZE).repeat()
+val_univariate = window_dataset(ts_data.values, TRAIN_SPLIT, None, univariate_past_history,
+                                univariate_future_target, batch_size=BATCH_SIZE, repeat=True)
+
+print("Input pipeline: %.1f batches/sec" % measure_throughput(train_univariate))
 
 lstm_model = tf.keras.models.Sequential([
-    tf.keras.layers.LSTM(128, input_shape=x_train.shape[-2:]),
+    tf.keras.layers.LSTM(128, input_shape=(univariate_past_history, 1)),
     tf.keras.layers.Dense(univariate_future_target)
 ])
 
@@ -81,7 +83,8 @@ EPOCHS = 10
 
 lstm_model.fit(train_univariate, epochs=EPOCHS,
                       steps_per_epoch=EVALUATION_INTERVAL,
-                      validation_data=val_univariate, validation_steps=50)
+                      validation_data=val_univariate, validation_steps=50,
+                      callbacks=[StepsPerSecond()])
 """
 for x, y in val_univariate:
     plot = []
@@ -58,6 +58,64 @@ def ts_memory_ds(df, node, param):
 
     return pd.DataFrame(data=ts_memory, index=["time", "memory"])
 
+
+def memory_steps(df):
+    """
+    Takes as input a dataframe with the jobs of one node
+    Returns the sorted times where the used memory changes and the memory used from each of these times until the
+    next one. The memory of the node is a step function that only changes at the time_in and time_out of its jobs
+    """
+    # Jobs with no duration never use memory
+    df = df[df['time_in'] < df['time_out']]
+    memory = df['memory'].values.astype(np.float64)
+
+    # The node starts empty at time 0
+    times = np.concatenate(([0.0], df['time_in'].values, df['time_out'].values))
+    deltas = np.concatenate(([0.0], memory, -memory))
+
+    # Jobs starting or finishing at the same time are merged in a single step
+    times, inverse = np.unique(times, return_inverse=True)
+    deltas = np.bincount(inverse, weights=deltas, minlength=len(times))
+
+    return times, np.cumsum(deltas)
+
+
+def ts_memory_agg(df, node, param, resolution=0.1):
+    """
+    This functions takes as input a dataframe a node the parameters and the size in seconds of the time buckets
+    Returns a dataframe with the start time of each bucket and the exact time-weighted mean, max and min memory used
+    by the node during the bucket. It is computed directly from the intervals of the jobs, so the memory needed only
+    depends on the number of buckets and any resolution can be used on the whole simulation
+    """
+    times, levels = memory_steps(data_from_node(df, node))
+
+    n_buckets = int(np.ceil(param.simulation_time / resolution))
+    edges = np.arange(n_buckets + 1) * resolution
+    edges[-1] = param.simulation_time
+
+    # Memory used at the start of each bucket, before the first step the node is empty
+    levels = np.concatenate(([0.0], levels))
+    start = levels[np.searchsorted(times, edges[:-1], side='right')]
+
+    # Integral of the memory from the first step to every step and to every bucket edge
+    area = np.concatenate(([0.0], np.cumsum(levels[1:-1] * np.diff(times))))
+    idx = np.searchsorted(times, edges, side='right')
+    area_edges = np.where(idx > 0, area[idx - 1] + levels[idx] * (edges - times[np.maximum(idx - 1, 0)]), 0.0)
+
+    # Steps that happen inside a bucket can raise its max or lower its min
+    inside = (times > 0) & (times < param.simulation_time)
+    bucket = np.searchsorted(edges, times[inside], side='right') - 1
+    memory_max = start.copy()
+    memory_min = start.copy()
+    np.maximum.at(memory_max, bucket, levels[1:][inside])
+    np.minimum.at(memory_min, bucket, levels[1:][inside])
+
+    return pd.DataFrame({"time": edges[:-1],
+                         "memory": np.diff(area_edges) / np.diff(edges),
+                         "memory_max": memory_max,
+                         "memory_min": memory_min},
+                        columns=["time", "memory", "memory_max", "memory_min"])
+
 def plot_ts(data, node):
     """
     This function take as input a time-series and plots it
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import time
+
+import numpy as np
+import tensorflow as tf
+
+
+def window_dataset(series, start_index, end_index, history_size, target_size, target_column=0, step=1,
+                   single_step=False, batch_size=100, shuffle_buffer=None, seed=None, mean=None, std=None,
+                   dtype=np.float32, cache_path=None, repeat=False):
+    """
+    Takes as input a (time-steps,) or (time-steps, features) series, for example the values of a SeriesStore, the
+    first and last time-steps to take samples from, the sizes of the history and the target, the feature to predict,
+    the step between the sampled time-steps of the history and whether to predict a single time-step
+    Returns a batched tf.data.Dataset with the same samples as univariate_data for a 1-D series and as
+    multivariate_data for a 2-D one. Only the series is kept in memory, the windows of each batch are gathered from it
+    by index in parallel when the batch is requested. If mean and std are passed the windows are normalized with them
+    The series and the windows have the type dtype
+
+    The samples are shuffled with a buffer of shuffle_buffer samples and batches are prefetched while the model trains.
+    With cache_path the windows are built once and cached in that file, which trades disk space for the windowing work
+    of the following epochs. The name of the file ends with a hash of the series and of the arguments the windows
+    depend on, so a cache of other data is never reused. With repeat the dataset never ends, as needed by fit with
+    steps_per_epoch
+    """
+    values = np.asarray(series, dtype=dtype)
+    univariate = values.ndim == 1
+    if univariate:
+        values = values[:, np.newaxis]
+
+    start_index = start_index + history_size
+    if end_index is None:
+        end_index = len(values) - target_size
+
+    if cache_path is not None:
+        cache_path = cache_path + "_" + window_hash(values, start_index, end_index, history_size, target_size,
+                                                    target_column, step, single_step, mean, std)
+
+    values = tf.convert_to_tensor(values)
+    target = values[:, target_column]
+    history = tf.range(-history_size, 0, step, dtype=tf.int64)
+    future = tf.range(target_size, dtype=tf.int64)
+    if mean is not None:
+        mean = np.atleast_1d(np.asarray(mean, dtype=dtype))
+        std = np.atleast_1d(np.asarray(std, dtype=dtype))
+
+    def make_windows(indices):
+        data = tf.gather(values, indices[..., tf.newaxis] + history)
+        if single_step:
+            labels = tf.gather(target, indices + target_size)
+        else:
+            labels = tf.gather(target, indices[..., tf.newaxis] + future)
+
+        if mean is not None:
+            data = (data - mean) / std
+            labels = (labels - mean[target_column]) / std[target_column]
+
+        # Univariate labels have the (target_size, 1) shape of univariate_data
+        if univariate and not single_step:
+            labels = labels[..., tf.newaxis]
+        return data, labels
+
+    dataset = tf.data.Dataset.range(start_index, end_index)
+    if cache_path is not None:
+        # Windows are cached one by one so their order can still be shuffled every epoch
+        dataset = dataset.map(make_windows, num_parallel_calls=tf.data.experimental.AUTOTUNE)
+        dataset = dataset.cache(cache_path)
+        if shuffle_buffer:
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+        dataset = dataset.batch(batch_size)
+    else:
+        # Indices are shuffled and batched first so the windows of a batch are gathered in a single call
+        if shuffle_buffer:
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.map(make_windows, num_parallel_calls=tf.data.experimental.AUTOTUNE)
+
+    if repeat:
+        dataset = dataset.repeat()
+
+    return dataset.prefetch(tf.data.experimental.AUTOTUNE)
+
+
+def window_hash(values, start_index, end_index, history_size, target_size, target_column, step, single_step, mean,
+                std):
+    """
+    Returns the hash of the series values and of the arguments of window_dataset that change its windows
+    """
+    description = {"start_index": int(start_index),
+                   "end_index": int(end_index),
+                   "history_size": int(history_size),
+                   "target_size": int(target_size),
+                   "target_column": int(target_column),
+                   "step": int(step),
+                   "single_step": bool(single_step),
+                   "mean": None if mean is None else np.atleast_1d(mean).astype(np.float64).tolist(),
+                   "std": None if std is None else np.atleast_1d(std).astype(np.float64).tolist(),
+                   "dtype": values.dtype.name,
+                   "shape": list(values.shape)}
+    digest = hashlib.sha256(json.dumps(description, sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(values))
+    return digest.hexdigest()[:16]
+
+
+def measure_throughput(dataset, steps=200):
+    """
+    Returns the number of batches per second a dataset produces, reading up to steps batches without training
+    """
+    iterator = iter(dataset)
+    # The first batch includes the start of the pipeline
+    next(iterator)
+
+    start = time.time()
+    count = 0
+    for _ in range(steps):
+        try:
+            next(iterator)
+        except StopIteration:
+            break
+        count += 1
+
+    return count / (time.time() - start)
+
+
+class StepsPerSecond(tf.keras.callbacks.Callback):
+    """
+    Keras callback that prints the training steps per second reached in every epoch
+    """
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.steps = 0
+        self.start = time.time()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        steps_per_sec = self.steps / (time.time() - self.start)
+        if logs is not None:
+            logs['steps_per_sec'] = steps_per_sec
+        print("Epoch %d: %.1f steps/sec" % (epoch + 1, steps_per_sec))
@@ -1,6 +1,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from tqdm import tqdm
 
 
@@ -155,20 +156,29 @@ def avg_pred(y_pred):
 
 def multivariate_data(dataset, target, start_index, end_index, history_size,
                       target_size, step, single_step=False):
-  data = []
-  labels = []
+    """
+    Takes as input a dataframe with the features, the target series, the first and last time-steps to take samples
+    from, the sizes of the history and the target, the step between the sampled time-steps of the history and whether
+    to predict a single time-step
+    Returns the float32 (samples, history_size / step, features) data and the (samples,) labels for single_step or
+    the (samples, target_size) labels. The windows are strided views over the NumPy arrays, no sample is copied
+    """
+    dataset = np.asarray(dataset, dtype=np.float32)
+    target = np.asarray(target, dtype=np.float32)
 
-  start_index = start_index + history_size
-  if end_index is None:
-    end_index = len(dataset) - target_size
+    start_index = start_index + history_size
+    if end_index is None:
+        end_index = len(dataset) - target_size
+    # With less time-steps than a sample there are no samples, the slices must not wrap around
+    end_index = max(end_index, start_index)
 
-  for i in range(start_index, end_index):
-    indices = range(i-history_size, i, step)
-    data.append(np.array(dataset.loc[indices]))
+    # Window k starts at the time-step k, its shape is (features, history_size) so it is swapped to (history, features)
+    data = sliding_window_view(dataset, history_size, axis=0)[start_index - history_size:end_index - history_size]
+    data = np.swapaxes(data[:, :, ::step], 1, 2)
 
     if single_step:
-      labels.append(target.loc[i+target_size])
+        labels = target[start_index + target_size:end_index + target_size]
     else:
-      labels.append(target.loc[i:i+target_size])
+        labels = sliding_window_view(target, target_size)[start_index:end_index]
 
-  return np.array(data), np.array(labels)
\ No newline at end of file
+    return data, labels
\ No newline at end of file
@@ -1,87 +1,92 @@
-import pandas as pd
+import os
+
 import tensorflow as tf
 
 from parameters import Parameters
-from functions import ts_memory, univariate_data, ms_val, avg_pred, line_plot
+from functions import univariate_data, ms_val, avg_pred, line_plot
+from cache import cached_memory_store
+from pipeline import window_dataset, measure_throughput, StepsPerSecond
+from normalizer import Normalizer
+from models import build_lstm, save_forecaster, load_forecaster
 
 # import parameters
 param = Parameters()
 node = 3
 
-"""
-# First we create the time-series and save them to a file
-# Node to obtain time-series from
-node = 3
+# The trained model is saved in this folder with its normalizer and window config, when it exists the training is
+# skipped and the saved model is used to predict. Set RETRAIN to train it again
+FORECASTER_DIR = 'forecaster_' + str(node)
+RETRAIN = False
 
-# Storing the CSV into a DF
-results = pd.read_csv("Results.csv")
-
-# Obtain time series of memory usage in node 3
-ts = ts_memory(results, node, param)
-
-# Save them to disk
-ts.to_pickle('ts.pkl')
-"""
-# Use the already saved time-series by loading them from file
-ts = pd.read_pickle('ts.pkl')
+# Obtain time series of memory usage in node 3, it is only extracted from Results.csv when it is not cached
+store = cached_memory_store("Results.csv", param, [node])
+ts = store[:]
 
 # Plot time-series
-# plot_ts(ts["memory"], node)
+# plot_ts(ts["memory_" + str(node)], node)
 
 # Plot time-series
-# plot_ts(ts["memory"][:2000], node)
+# plot_ts(ts["memory_" + str(node)][:2000], node)
 
 # Set seed for reproducibility
 tf.random.set_seed(13)
 
 # Take data
-ts_data = ts['memory']
-ts_data.index = ts['time']
+ts_data = ts['memory_' + str(node)]
 
 # We will use 70% percent of data to train
 TRAIN_SPLIT = 0.7
 TRAIN_SPLIT = int(TRAIN_SPLIT*ts_data.size)
 
-# Normalize data
-ts_data_mean = ts_data[:TRAIN_SPLIT].mean()
-ts_data_std = ts_data[:TRAIN_SPLIT].std()
-ts_data = (ts_data-ts_data_mean) / ts_data_std
-
 # Get the training and validation data and targets
 univariate_past_history = 150
 univariate_future_target = 5
 
-x_train, y_train = univariate_data(ts_data, 0, TRAIN_SPLIT,
-                                           univariate_past_history,
-                                           univariate_future_target)
+predict_only = os.path.exists(FORECASTER_DIR) and not RETRAIN
+if predict_only:
+    lstm_model, normalizer, config = load_forecaster(FORECASTER_DIR)
+    univariate_past_history = config["past_history"]
+    univariate_future_target = config["future_target"]
+else:
+    # Normalize data with the statistics of the train split, they are saved with the model to normalize new data
+    normalizer = Normalizer().fit(ts_data.values[:TRAIN_SPLIT])
+    store.set_stats(normalizer.mean, normalizer.std())
+ts_data = normalizer.transform(ts_data.values.astype(param.dtype), inplace=True)
+
 x_val, y_val = univariate_data(ts_data, TRAIN_SPLIT, None,
                                        univariate_past_history,
                                        univariate_future_target)
 
-# show_plot([x_train[0], y_train[0]], univariate_future_target, 'Sample Example')
+# show_plot([x_val[0], y_val[0]], univariate_future_target, 'Sample Example')
+
+if not predict_only:
+    BATCH_SIZE = 100
+    BUFFER_SIZE = 10000
 
-BATCH_SIZE = 100
-# BUFFER_SIZE = 10000
+    # The windows are gathered from the series when each batch is requested
+    train_univariate = window_dataset(ts_data, 0, TRAIN_SPLIT, univariate_past_history,
+                                      univariate_future_target, batch_size=BATCH_SIZE, shuffle_buffer=BUFFER_SIZE,
+                                      seed=13, dtype=param.dtype, repeat=True)
 
-train_univariate = tf.data.Dataset.from_tensor_slices((x_train, y_train))
-train_univariate = train_univariate.cache().batch(BATCH_SIZE).repeat()
+    val_univariate = window_dataset(ts_data, TRAIN_SPLIT, None, univariate_past_history,
+                                    univariate_future_target, batch_size=BATCH_SIZE, dtype=param.dtype, repeat=True)
 
-val_univariate = tf.data.Dataset.from_tensor_slices((x_val, y_val))
-val_univariate = val_univariate.batch(BATCH_SIZE).repeat()
+    print("Input pipeline: %.1f batches/sec" % measure_throughput(train_univariate))
 
-lstm_model = tf.keras.models.Sequential([
-    tf.keras.layers.LSTM(128, input_shape=x_train.shape[-2:]),
-    tf.keras.layers.Dense(univariate_future_target)
-])
+    lstm_model = build_lstm(univariate_past_history, univariate_future_target)
 
-lstm_model.compile(optimizer='adam', loss='mae')
+    EVALUATION_INTERVAL = 200
+    EPOCHS = 10
 
-EVALUATION_INTERVAL = 200
-EPOCHS = 10
+    lstm_model.fit(train_univariate, epochs=EPOCHS,
+                          steps_per_epoch=EVALUATION_INTERVAL,
+                          validation_data=val_univariate, validation_steps=50,
+                          callbacks=[StepsPerSecond()])
 
-lstm_model.fit(train_univariate, epochs=EPOCHS,
-                      steps_per_epoch=EVALUATION_INTERVAL,
-                      validation_data=val_univariate, validation_steps=50)
+    save_forecaster(FORECASTER_DIR, lstm_model, normalizer,
+                    {"node": node, "features": ["memory_" + str(node)], "target_column": 0,
+                     "past_history": univariate_past_history, "future_target": univariate_future_target,
+                     "step": 1, "dtype": param.dtype, "series": store.path})
 """
 for x, y in val_univariate:
     plot = []
@@ -0,0 +1,202 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class Forecaster(ABC):
+    """
+    Base of the NumPy forecasters. They take the windows of univariate_data: the (windows, history, 1) or
+    (windows, history) histories x and the (windows, target_size, 1) targets y, and predict the (windows, target_size)
+    next values of every window. Windows are processed in chunks of chunksize so the strided views of univariate_data
+    are never copied whole
+    """
+
+    chunksize = 65536
+
+    def __init__(self, target_size):
+        self.target_size = target_size
+
+    @staticmethod
+    def windows(x):
+        x = np.asarray(x)
+        if x.ndim == 3:
+            x = x[..., 0]
+        return x
+
+    @staticmethod
+    def sample(x, y, max_windows, seed=0):
+        """
+        Returns at most max_windows of the windows, used to choose the parameters of the forecasters
+        """
+        if max_windows is None or len(x) <= max_windows:
+            return x, y
+        index = np.sort(np.random.default_rng(seed).choice(len(x), max_windows, replace=False))
+        return x[index], y[index]
+
+    def fit(self, x, y):
+        return self
+
+    def predict(self, x):
+        x = self.windows(x)
+        return np.concatenate([self.predict_chunk(x[i:i + self.chunksize])
+                               for i in range(0, len(x), self.chunksize)])
+
+    @abstractmethod
+    def predict_chunk(self, x):
+        """
+        Returns the (windows, target_size) forecasts of a chunk of (windows, history) windows
+        """
+
+    def score(self, x, y):
+        """
+        Returns the mean absolute error of the forecasts of the windows
+        """
+        x = self.windows(x)
+        y = self.windows(y)
+        return np.mean([np.abs(self.predict_chunk(x[i:i + self.chunksize]) - y[i:i + self.chunksize]).mean()
+                        for i in range(0, len(x), self.chunksize)])
+
+
+class SeasonalNaive(Forecaster):
+    """
+    Predicts that every value repeats the one of one period before. In the simulations the sensors emit every 75
+    seconds with a deterministic distribution, so with a resolution of one second the period is 75 time-steps
+    """
+
+    def __init__(self, target_size, period=75):
+        super().__init__(target_size)
+        self.period = period
+
+    def predict_chunk(self, x):
+        if x.shape[1] < self.period:
+            raise ValueError("The history has to be at least one period long")
+        index = x.shape[1] - self.period + np.arange(self.target_size) % self.period
+        return x[:, index]
+
+
+class EWMA(Forecaster):
+    """
+    Predicts the exponentially weighted moving average of the history for all the future values
+    The level of a window is a dot product with the weights alpha*(1 - alpha)^k of the last values, the first value of
+    the window is the initial level. If alpha is not given it is chosen in fit from alphas
+    """
+
+    def __init__(self, target_size, alpha=None, alphas=np.linspace(0.05, 1, 20), max_fit_windows=20000):
+        super().__init__(target_size)
+        self.alpha = alpha
+        self.alphas = alphas
+        self.max_fit_windows = max_fit_windows
+
+    def weights(self, history, alpha):
+        weights = alpha * (1 - alpha) ** np.arange(history - 1, -1, -1, dtype=np.float64)
+        weights[0] = (1 - alpha) ** (history - 1)
+        return weights
+
+    def fit(self, x, y):
+        if self.alpha is None:
+            x, y = self.sample(self.windows(x), self.windows(y), self.max_fit_windows)
+            errors = []
+            for alpha in self.alphas:
+                self.alpha = alpha
+                errors.append(self.score(x, y))
+            self.alpha = self.alphas[int(np.argmin(errors))]
+        return self
+
+    def predict_chunk(self, x):
+        level = x.astype(np.float64) @ self.weights(x.shape[1], self.alpha)
+        return np.repeat(level[:, np.newaxis], self.target_size, axis=1)
+
+
+class HoltWinters(Forecaster):
+    """
+    Additive Holt-Winters with level, trend and a season of period time-steps, run over every window at the same time
+    The states start from the first season of the window, and from the first two seasons for the trend when the
+    history is long enough. If alpha and gamma are not given they are chosen in fit from the grid
+    """
+
+    def __init__(self, target_size, period=75, alpha=None, beta=0.01, gamma=None,
+                 grid=(0.05, 0.1, 0.2, 0.4, 0.7), max_fit_windows=5000):
+        super().__init__(target_size)
+        self.period = period
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.grid = grid
+        self.max_fit_windows = max_fit_windows
+
+    def fit(self, x, y):
+        if self.alpha is None or self.gamma is None:
+            x, y = self.sample(self.windows(x), self.windows(y), self.max_fit_windows)
+            alphas = self.grid if self.alpha is None else [self.alpha]
+            gammas = self.grid if self.gamma is None else [self.gamma]
+            best = None
+            for alpha in alphas:
+                for gamma in gammas:
+                    self.alpha, self.gamma = alpha, gamma
+                    error = self.score(x, y)
+                    if best is None or error < best[0]:
+                        best = (error, alpha, gamma)
+            _, self.alpha, self.gamma = best
+        return self
+
+    def predict_chunk(self, x):
+        x = x.astype(np.float64)
+        history = x.shape[1]
+        period = self.period
+        if history < period:
+            raise ValueError("The history has to be at least one period long")
+
+        level = x[:, :period].mean(axis=1)
+        if history >= 2 * period:
+            trend = (x[:, period:2 * period].mean(axis=1) - level) / period
+        else:
+            trend = np.zeros(len(x))
+        season = x[:, :period] - level[:, np.newaxis]
+
+        for t in range(history):
+            s = season[:, t % period]
+            previous_level = level
+            level = self.alpha * (x[:, t] - s) + (1 - self.alpha) * (level + trend)
+            trend = self.beta * (level - previous_level) + (1 - self.beta) * trend
+            season[:, t % period] = self.gamma * (x[:, t] - level) + (1 - self.gamma) * s
+
+        h = np.arange(1, self.target_size + 1)
+        return level[:, np.newaxis] + h * trend[:, np.newaxis] + season[:, (history - 1 + h) % period]
+
+
+class AR(Forecaster):
+    """
+    Least-squares autoregressive model of order p with an intercept. Every future value has its own coefficients on
+    the last p values (direct strategy), so there is no recursion. The normal equations are accumulated in chunks of
+    windows, the memory used does not depend on the number of training windows
+    """
+
+    def __init__(self, target_size, p=75, ridge=1e-6):
+        super().__init__(target_size)
+        self.p = p
+        self.ridge = ridge
+        self.coef = None
+
+    def features(self, x):
+        x = x[:, -self.p:].astype(np.float64)
+        return np.hstack([x, np.ones((len(x), 1))])
+
+    def fit(self, x, y):
+        x = self.windows(x)
+        y = self.windows(y)
+        if x.shape[1] < self.p:
+            raise ValueError("The history has to be at least p time-steps long")
+
+        xtx = np.zeros((self.p + 1, self.p + 1))
+        xty = np.zeros((self.p + 1, self.target_size))
+        for i in range(0, len(x), self.chunksize):
+            features = self.features(x[i:i + self.chunksize])
+            xtx += features.T @ features
+            xty += features.T @ y[i:i + self.chunksize].astype(np.float64)
+
+        xtx[np.diag_indices_from(xtx)] += self.ridge * len(x)
+        self.coef = np.linalg.solve(xtx, xty)
+        return self
+
+    def predict_chunk(self, x):
+        return self.features(x) @ self.coef
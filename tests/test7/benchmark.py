@@ -0,0 +1,128 @@
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from parameters import Parameters
+from functions import univariate_data
+from cache import cached_memory_series
+from normalizer import Normalizer
+from baselines import SeasonalNaive, EWMA, HoltWinters, AR
+
+# Compares the NumPy forecasters with the LSTM of analysis.py on the memory of a node in the simulations of test4-test7
+# Run with --no-lstm to benchmark only the NumPy forecasters, TensorFlow is then never imported
+TESTS = ["test4", "test5", "test6", "test7"]
+node = 3
+
+TRAIN_SPLIT = 0.7
+past_history = 150
+future_target = 5
+
+# Windows predicted one by one to measure the latency of a single prediction
+LATENCY_SAMPLES = 200
+LSTM = "--no-lstm" not in sys.argv
+
+
+def test_parameters(test):
+    """
+    Returns the Parameters of a test, with the dtype of the parameters of test7
+    """
+    spec = importlib.util.spec_from_file_location(test + "_parameters", os.path.join("..", test, "parameters.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    param = module.Parameters()
+    param.dtype = Parameters().dtype
+    return param
+
+
+def lstm_forecaster(train_split, ts_data, param):
+    """
+    Returns the LSTM of analysis.py trained on the train split, with a predict(x) like the NumPy forecasters
+    """
+    import tensorflow as tf
+    from models import build_lstm
+    from pipeline import window_dataset
+
+    tf.random.set_seed(13)
+    train = window_dataset(ts_data, 0, train_split, past_history, future_target, batch_size=100,
+                           shuffle_buffer=10000, seed=13, dtype=param.dtype, repeat=True)
+    model = build_lstm(past_history, future_target)
+    model.fit(train, epochs=10, steps_per_epoch=200, verbose=0)
+
+    signature = [tf.TensorSpec([None, past_history, 1], tf.as_dtype(param.dtype))]
+    predict_fn = tf.function(lambda x: model(x, training=False), input_signature=signature)
+
+    class LSTMForecaster():
+        def predict(self, x):
+            return np.concatenate([predict_fn(tf.constant(x[i:i + 4096])).numpy() for i in range(0, len(x), 4096)])
+
+    return LSTMForecaster()
+
+
+def benchmark(name, fit, x_val, y_val, normalizer):
+    """
+    Returns the row of the results of a forecaster: errors in the original units, training time, time to predict all
+    the validation windows and median latency of a single prediction
+    """
+    start = time.time()
+    forecaster = fit()
+    train_time = time.time() - start
+
+    start = time.time()
+    y_pred = forecaster.predict(x_val)
+    predict_time = time.time() - start
+
+    latencies = []
+    for i in np.linspace(0, len(x_val) - 1, LATENCY_SAMPLES).astype(int):
+        start = time.time()
+        forecaster.predict(x_val[i:i + 1])
+        latencies.append(time.time() - start)
+
+    error = (y_pred - y_val[..., 0]) * normalizer.std()
+    return {"model": name,
+            "mae": np.abs(error).mean(),
+            "rmse": np.sqrt((error ** 2).mean()),
+            "train_time": train_time,
+            "predict_time": predict_time,
+            "latency_ms": 1000 * np.median(latencies)}
+
+
+results = []
+for test in TESTS:
+    path = os.path.join("..", test, "Results.csv")
+    if not os.path.exists(path):
+        print("Skipping %s, there is no Results.csv" % test)
+        continue
+
+    param = test_parameters(test)
+    ts = cached_memory_series(path, param, [node])
+    ts_data = ts['memory_' + str(node)].values.astype(param.dtype)
+
+    train_split = int(TRAIN_SPLIT * len(ts_data))
+    normalizer = Normalizer().fit(ts_data[:train_split])
+    ts_data = normalizer.transform(ts_data, inplace=True)
+
+    x_train, y_train = univariate_data(ts_data, 0, train_split, past_history, future_target)
+    x_val, y_val = univariate_data(ts_data, train_split, None, past_history, future_target)
+
+    forecasters = [("seasonal_naive", lambda: SeasonalNaive(future_target)),
+                   ("ewma", lambda: EWMA(future_target).fit(x_train, y_train)),
+                   ("holt_winters", lambda: HoltWinters(future_target).fit(x_train, y_train)),
+                   ("ar", lambda: AR(future_target).fit(x_train, y_train))]
+    if LSTM:
+        forecasters.append(("lstm", lambda: lstm_forecaster(train_split, ts_data, param)))
+
+    for name, fit in forecasters:
+        row = benchmark(name, fit, x_val, y_val, normalizer)
+        row["test"] = test
+        results.append(row)
+        print("%s %s: MAE %.1f, train %.2f s, latency %.3f ms" % (test, name, row["mae"], row["train_time"],
+                                                                  row["latency_ms"]))
+
+results = pd.DataFrame(results, columns=["test", "model", "mae", "rmse", "train_time", "predict_time", "latency_ms"])
+results.to_csv("benchmark.csv", index=False)
+print(results)
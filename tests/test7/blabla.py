@@ -1,21 +1,19 @@
 from parameters import Parameters
 
 import pandas as pd
-from functions import ts_memory_noise, ts_memory
+from functions import ts_memory_noise, ts_memory_nodes
 
 # import parameters
 param = Parameters()
 
 # First we create the time-series and save them to a file
-# Node to obtain time-series from
-node = 3
+# Nodes to obtain time-series from
+nodes = [2, 3]
 
 # Storing the CSV into a DF
 results = pd.read_csv("Results.csv")
 
 # Obtaining time-series of desired nodes
-ts = ts_memory(results, node, param)
-
-ts = pd.concat([ts[0], ts[1]], axis = 1)
+ts = ts_memory_nodes(results, param, nodes)
 
 ts.to_pickle('ts_noise.pkl')
\ No newline at end of file
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from functions import RESULTS_DTYPES, ts_memory_stream, ts_memory_agg, add_noise
+from store import file_hash, save_series, SeriesStore
+
+
+class SeriesCache():
+    """
+    Cache on disk of extracted time series, each entry is a SeriesStore in a folder named by the hash of its key
+    When the total size goes over max_bytes the least recently used entries are removed
+    New entries are written in a temporary folder of the cache and renamed to their key when they are complete, so an
+    entry that is being written or whose writing failed is never read
+    """
+
+    def __init__(self, cache_dir='ts_cache', max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def key(self, source_hash, simulation_time, nodes, resolution, seed, dtype):
+        """
+        Returns the key of a series, the hash of everything the extracted values depend on
+        """
+        description = {"source_hash": source_hash,
+                       "simulation_time": simulation_time,
+                       "nodes": [int(node) for node in nodes] if nodes is not None else None,
+                       "resolution": resolution,
+                       "seed": seed,
+                       "dtype": np.dtype(dtype).name}
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the SeriesStore of a key or None if it is not in the cache or its values are not complete
+        """
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+
+        store = SeriesStore(path)
+        size = len(store) * len(store.columns) * store.dtype.itemsize
+        if os.path.getsize(os.path.join(path, 'series.bin')) != size:
+            return None
+
+        # The modification time of the entry folder is its last use
+        os.utime(path, None)
+        return store
+
+    def put(self, key, ts, **meta):
+        """
+        Saves a series in the cache and removes old entries if the cache is too big
+        Returns the SeriesStore of the saved series
+        """
+        path = os.path.join(self.cache_dir, key)
+        temp = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            save_series(ts, temp, **meta)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(temp, path)
+        except BaseException:
+            shutil.rmtree(temp, ignore_errors=True)
+            raise
+
+        self.evict(keep=key)
+        return SeriesStore(path)
+
+    def entries(self):
+        """
+        Returns the (last use, size in bytes, key) of every entry of the cache
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, key)
+            if not os.path.isdir(path) or key.startswith('.tmp-'):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, key))
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the cache fits in max_bytes, the entry keep is never removed
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, key))
+            total -= size
+
+
+def extract_series(path, param, nodes=None, resolution=1, seed=None):
+    """
+    Takes as input the path of a Results.csv file the parameters the nodes the seconds per time-step and the noise seed
+    Returns the time series of memory of the nodes, with noise if a seed is passed
+    """
+    if resolution == 1:
+        ts = ts_memory_stream(path, param, nodes)
+    else:
+        results = pd.read_csv(path, usecols=list(RESULTS_DTYPES), dtype=RESULTS_DTYPES)
+        if nodes is None:
+            nodes = sorted(results['TOPO.dst'].unique())
+        ts = pd.DataFrame()
+        for node in nodes:
+            ts_node = ts_memory_agg(results, node, param, resolution)
+            if "time" not in ts:
+                ts["time"] = ts_node["time"]
+            ts["memory_" + str(node)] = ts_node["memory"]
+
+    if seed is not None:
+        for column in ts.columns[1:]:
+            noisy = add_noise(ts[["time", column]].rename(columns={column: "memory"}), seed=[seed, int(column[len("memory_"):])])
+            ts[column] = noisy["memory"].astype(param.dtype)
+
+    return ts
+
+
+def cached_memory_store(path, param, nodes=None, resolution=1, seed=None, cache=None):
+    """
+    Same as cached_memory_series but returns the SeriesStore of the cached series, whose values are memory-mapped
+    and can be opened from other processes with its path
+    """
+    if cache is None:
+        cache = SeriesCache()
+
+    source_hash = file_hash(path)
+    key = cache.key(source_hash, param.simulation_time, nodes, resolution, seed, param.dtype)
+
+    store = cache.get(key)
+    if store is None:
+        ts = extract_series(path, param, nodes, resolution, seed)
+        store = cache.put(key, ts, nodes=nodes, resolution=resolution, source=path, source_hash=source_hash)
+
+    return store
+
+
+def cached_memory_series(path, param, nodes=None, resolution=1, seed=None, cache=None):
+    """
+    This functions takes as input the path of a Results.csv file the parameters the nodes the seconds per time-step
+    the noise seed and optionally the cache to use
+    Returns the dataframe with the time and the "memory_<node>" columns. It is read from the cache when the same
+    series of the same Results.csv content was already extracted and it is extracted and cached otherwise
+    """
+    return cached_memory_store(path, param, nodes, resolution, seed, cache)[:]
@@ -1,6 +1,12 @@
+import hashlib
+import io
+import json
+import os
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from tqdm import tqdm
 
 
@@ -40,24 +46,458 @@ def ts_memory(df, node, param):
     return pd.DataFrame(data=ts_memory, columns=["time", "memory"])
 
 
-def ts_memory_noise(df, node, param):
+def memory_sweep(df, times):
     """
-    This functions takes as input a dataframe a node and the parameters
-    Returns an array of time series with the used memory of the node at each time-step
+    Takes as input a dataframe with the jobs of one node and a sorted array of times
+    Returns an array with the memory used at each of the times, that is the same sum that filter_time gives
+    Every job is an event that adds its memory at time_in and frees it at time_out. The events are sorted once and
+    the memory at each time is read from their cumulative sums with searchsorted
     """
-    ts_memory = []
+    # Jobs with no duration are never found by filter_time
+    df = df[df['time_in'] < df['time_out']]
+    memory = df['memory'].values
+
+    order_in = np.argsort(df['time_in'].values, kind='stable')
+    order_out = np.argsort(df['time_out'].values, kind='stable')
+    time_in = df['time_in'].values[order_in]
+    time_out = df['time_out'].values[order_out]
+
+    cum_in = np.concatenate(([0], np.cumsum(memory[order_in])))
+    cum_out = np.concatenate(([0], np.cumsum(memory[order_out])))
+
+    # Memory of the jobs started strictly before each time minus the jobs already finished at that time
+    started = cum_in[np.searchsorted(time_in, times, side='left')]
+    finished = cum_out[np.searchsorted(time_out, times, side='right')]
 
+    return started - finished
+
+
+def ts_memory_sweep(df, node, param):
+    """
+    This functions takes as input a dataframe a node and the parameters
+    Returns the same time series as ts_memory but computed from the start and end events of the jobs of the node
+    instead of scanning all the jobs at every time-step
+    """
     df = data_from_node(df, node)
 
-    for time in tqdm(range(param.simulation_time)):
-        memory = 0
-        for idx, data in filter_time(df, time).iterrows():
-            memory += data['memory']
+    time = np.arange(param.simulation_time)
+    memory = memory_sweep(df, time)
 
-        memory = (np.random.randn(1) + 1000) * np.random.randn(1) + memory
-        ts_memory.append([time, memory[0]])
+    return pd.DataFrame({"time": time, "memory": memory}, columns=["time", "memory"])
 
-    return pd.DataFrame(data=ts_memory, columns=["time", "memory"])
+
+def ts_memory_nodes(df, param, nodes=None):
+    """
+    This functions takes as input a dataframe the parameters and optionally the list of nodes to extract
+    Returns a dataframe with the time and one column "memory_<node>" of type param.dtype per node with its used memory
+    at each time-step. The dataframe is grouped by node once so all the nodes are obtained in a single pass over the jobs
+    """
+    if nodes is not None:
+        df = df[df['TOPO.dst'].isin(nodes)]
+
+    time = np.arange(param.simulation_time)
+    ts = {"time": time}
+    for node, node_df in df.groupby('TOPO.dst', sort=True):
+        ts["memory_" + str(node)] = memory_sweep(node_df, time).astype(param.dtype)
+
+    # Nodes that executed no job have an empty memory series
+    if nodes is not None:
+        for node in nodes:
+            ts.setdefault("memory_" + str(node), np.zeros(len(time), dtype=param.dtype))
+        columns = ["time"] + ["memory_" + str(node) for node in nodes]
+    else:
+        columns = list(ts.keys())
+
+    return pd.DataFrame(ts, columns=columns)
+
+
+def memory_steps(df):
+    """
+    Takes as input a dataframe with the jobs of one node
+    Returns the sorted times where the used memory changes and the memory used from each of these times until the
+    next one. The memory of the node is a step function that only changes at the time_in and time_out of its jobs
+    """
+    # Jobs with no duration never use memory
+    df = df[df['time_in'] < df['time_out']]
+    memory = df['memory'].values.astype(np.float64)
+
+    # The node starts empty at time 0
+    times = np.concatenate(([0.0], df['time_in'].values, df['time_out'].values))
+    deltas = np.concatenate(([0.0], memory, -memory))
+
+    # Jobs starting or finishing at the same time are merged in a single step
+    times, inverse = np.unique(times, return_inverse=True)
+    deltas = np.bincount(inverse, weights=deltas, minlength=len(times))
+
+    return times, np.cumsum(deltas)
+
+
+def ts_memory_agg(df, node, param, resolution=0.1):
+    """
+    This functions takes as input a dataframe a node the parameters and the size in seconds of the time buckets
+    Returns a dataframe with the start time of each bucket and the exact time-weighted mean, max and min memory used
+    by the node during the bucket. It is computed directly from the intervals of the jobs, so the memory needed only
+    depends on the number of buckets and any resolution can be used on the whole simulation
+    """
+    times, levels = memory_steps(data_from_node(df, node))
+
+    n_buckets = int(np.ceil(param.simulation_time / resolution))
+    edges = np.arange(n_buckets + 1) * resolution
+    edges[-1] = param.simulation_time
+
+    # Memory used at the start of each bucket, before the first step the node is empty
+    levels = np.concatenate(([0.0], levels))
+    start = levels[np.searchsorted(times, edges[:-1], side='right')]
+
+    # Integral of the memory from the first step to every step and to every bucket edge
+    area = np.concatenate(([0.0], np.cumsum(levels[1:-1] * np.diff(times))))
+    idx = np.searchsorted(times, edges, side='right')
+    area_edges = np.where(idx > 0, area[idx - 1] + levels[idx] * (edges - times[np.maximum(idx - 1, 0)]), 0.0)
+
+    # Steps that happen inside a bucket can raise its max or lower its min
+    inside = (times > 0) & (times < param.simulation_time)
+    bucket = np.searchsorted(edges, times[inside], side='right') - 1
+    memory_max = start.copy()
+    memory_min = start.copy()
+    np.maximum.at(memory_max, bucket, levels[1:][inside])
+    np.minimum.at(memory_min, bucket, levels[1:][inside])
+
+    return pd.DataFrame({"time": edges[:-1],
+                         "memory": (np.diff(area_edges) / np.diff(edges)).astype(param.dtype),
+                         "memory_max": memory_max.astype(param.dtype),
+                         "memory_min": memory_min.astype(param.dtype)},
+                        columns=["time", "memory", "memory_max", "memory_min"])
+
+
+# Only columns needed to build the memory series and their types when reading Results.csv
+RESULTS_DTYPES = {'TOPO.dst': np.int32, 'time_in': np.float64, 'time_out': np.float64, 'memory': np.float32}
+
+
+class MemoryAccumulator():
+    """
+    Running memory series of the nodes that can be fed with the jobs in several pieces
+    Every job adds its memory to the time-steps t with time_in < t < time_out through a difference array per node,
+    so the memory needed only depends on the simulation time and the number of nodes
+    With keep_open the jobs that go beyond the simulation time are kept so the series can be extended later
+    The sums are done in float64 and the series are returned with the type dtype
+    """
+
+    def __init__(self, simulation_time, nodes=None, keep_open=False, dtype=np.float32):
+        self.simulation_time = simulation_time
+        self.nodes = nodes
+        self.keep_open = keep_open
+        self.dtype = dtype
+        self.open_jobs = pd.DataFrame({column: np.array([], dtype=dtype) for column, dtype in RESULTS_DTYPES.items()})
+        self.diff = {}
+        if nodes is not None:
+            for node in nodes:
+                self.diff[node] = np.zeros(simulation_time + 1)
+
+    def update(self, df):
+        """
+        Adds the jobs of a dataframe to the memory series of their nodes
+        """
+        if self.nodes is not None:
+            df = df[df['TOPO.dst'].isin(self.nodes)]
+
+        # The last row of an interrupted simulation can be incomplete, its job is ignored like filter_time does
+        df = df[df['time_in'].notna() & df['time_out'].notna() & df['memory'].notna()]
+
+        for node in np.unique(df['TOPO.dst'].values):
+            if node not in self.diff:
+                self.diff[node] = np.zeros(self.simulation_time + 1)
+
+        self.add(df, 1)
+
+        if self.keep_open:
+            beyond = np.ceil(df['time_out'].values) - 1 >= self.simulation_time
+            if beyond.any():
+                self.open_jobs = pd.concat([self.open_jobs, df.loc[beyond, list(RESULTS_DTYPES)]], ignore_index=True)
+
+    def add(self, df, sign):
+        """
+        Adds (sign 1) or removes (sign -1) the memory of the jobs of a dataframe in the difference arrays
+        """
+        # First and last integer time-steps where each job is being executed
+        first = np.floor(df['time_in'].values).astype(np.int64) + 1
+        last = np.ceil(df['time_out'].values).astype(np.int64) - 1
+        first = np.clip(first, 0, self.simulation_time)
+        last = np.clip(last, -1, self.simulation_time - 1)
+
+        valid = first <= last
+        nodes = df['TOPO.dst'].values[valid]
+        memory = sign * df['memory'].values[valid].astype(np.float64)
+        first = first[valid]
+        last = last[valid]
+
+        for node in np.unique(nodes):
+            in_node = nodes == node
+            np.add.at(self.diff[node], first[in_node], memory[in_node])
+            np.add.at(self.diff[node], last[in_node] + 1, -memory[in_node])
+
+    def extend(self, simulation_time):
+        """
+        Makes the series longer, the jobs kept open are added again to the new time-steps they reach
+        """
+        if not self.keep_open:
+            raise ValueError("Only a MemoryAccumulator created with keep_open can be extended")
+        if simulation_time < self.simulation_time:
+            raise ValueError("The simulation time can not be reduced from " + str(self.simulation_time))
+
+        open_jobs = self.open_jobs
+        self.add(open_jobs, -1)
+        for node in self.diff:
+            self.diff[node] = np.concatenate((self.diff[node], np.zeros(simulation_time - self.simulation_time)))
+        self.simulation_time = simulation_time
+
+        self.open_jobs = self.open_jobs.iloc[:0]
+        self.update(open_jobs)
+
+    def to_frame(self):
+        """
+        Returns a dataframe with the time and one column "memory_<node>" per node like ts_memory_nodes
+        """
+        nodes = self.nodes if self.nodes is not None else sorted(self.diff)
+        ts = {"time": np.arange(self.simulation_time)}
+        for node in nodes:
+            ts["memory_" + str(node)] = np.cumsum(self.diff[node][:-1]).astype(self.dtype)
+
+        return pd.DataFrame(ts, columns=["time"] + ["memory_" + str(node) for node in nodes])
+
+
+class LimitedReader(io.RawIOBase):
+    """
+    Reads a file from its current position up to a number of bytes, used to parse only the complete rows of a file
+    """
+
+    def __init__(self, f, size):
+        self.f = f
+        self.left = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.f.read(min(len(buffer), self.left))
+        self.left -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class IncrementalExtraction():
+    """
+    Memory series of the nodes extracted from a Results.csv that keeps growing
+    It records a watermark with the byte offset and the max time_out read, so refresh only parses the rows appended
+    since the last call. Jobs still running at the watermark are written when they finish, after the watermark, and
+    are added to the past time-steps they cover when they are read
+    """
+
+    def __init__(self, path, simulation_time, nodes=None, dtype=np.float32):
+        self.path = path
+        self.dtype = dtype
+        self.reset(simulation_time, nodes)
+
+    def reset(self, simulation_time, nodes=None):
+        """
+        Forgets everything that was read, the file will be read again from the start
+        """
+        self.offset = 0
+        self.max_time_out = 0.0
+        self.header = None
+        self.tail_hash = None
+        self.accumulator = MemoryAccumulator(simulation_time, nodes, keep_open=True, dtype=self.dtype)
+
+    def read_tail_hash(self):
+        """
+        Returns the hash of the last bytes of the file before the watermark
+        """
+        with open(self.path, 'rb') as f:
+            f.seek(max(self.offset - 4096, 0))
+            return hashlib.sha256(f.read(self.offset - f.tell())).hexdigest()
+
+    def check_tail(self):
+        """
+        Returns True if the bytes before the watermark are the same that were read, that is the file only grew
+        """
+        if self.offset == 0:
+            return True
+        return os.path.getsize(self.path) >= self.offset and self.read_tail_hash() == self.tail_hash
+
+    def refresh(self, simulation_time=None, chunksize=1000000):
+        """
+        Reads the rows appended to the file since the last refresh and adds them to the series
+        The series is extended when a longer simulation time is passed and rebuilt when the file was rewritten
+        The new rows are parsed in chunks of chunksize rows, so the memory used does not grow with the rows appended
+        Returns the number of rows read
+        """
+        if not self.check_tail():
+            self.reset(self.accumulator.simulation_time, self.accumulator.nodes)
+        if simulation_time is not None and simulation_time > self.accumulator.simulation_time:
+            self.accumulator.extend(simulation_time)
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            if self.header is None:
+                line = f.readline()
+                # The header is still being written
+                if not line.endswith(b'\n'):
+                    return 0
+                self.header = line.decode().strip().split(',')
+                self.offset += len(line)
+
+            # A row that is still being written is left for the next refresh
+            end = self.last_line_end(f)
+            if end <= self.offset:
+                self.tail_hash = self.read_tail_hash()
+                return 0
+
+            f.seek(self.offset)
+            rows = 0
+            reader = io.BufferedReader(LimitedReader(f, end - self.offset))
+            try:
+                for chunk in pd.read_csv(reader, header=None, names=self.header, usecols=list(RESULTS_DTYPES),
+                                         dtype=RESULTS_DTYPES, chunksize=chunksize):
+                    self.accumulator.update(chunk)
+                    if len(chunk):
+                        self.max_time_out = max(self.max_time_out, float(chunk['time_out'].max()))
+                    rows += len(chunk)
+            except pd.errors.EmptyDataError:
+                # Only empty lines were appended
+                pass
+
+        self.offset = end
+        self.tail_hash = self.read_tail_hash()
+
+        return rows
+
+    def last_line_end(self, f, block=1 << 16):
+        """
+        Returns the offset just after the last end of line of the file that is after the watermark
+        """
+        position = f.seek(0, os.SEEK_END)
+        while position > self.offset:
+            start = max(position - block, self.offset)
+            f.seek(start)
+            data = f.read(position - start)
+            newline = data.rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+        return self.offset
+
+    def to_frame(self):
+        return self.accumulator.to_frame()
+
+    def save(self, state_dir):
+        """
+        Saves the watermark, the difference arrays and the open jobs in a folder
+        """
+        if not os.path.exists(state_dir):
+            os.makedirs(state_dir)
+
+        nodes = sorted(int(node) for node in self.accumulator.diff)
+        for node in nodes:
+            np.save(os.path.join(state_dir, 'diff_' + str(node) + '.npy'), self.accumulator.diff[node])
+        self.accumulator.open_jobs.to_csv(os.path.join(state_dir, 'open_jobs.csv'), index=False)
+
+        state = {"path": self.path,
+                 "offset": self.offset,
+                 "max_time_out": self.max_time_out,
+                 "header": self.header,
+                 "tail_hash": self.tail_hash,
+                 "simulation_time": self.accumulator.simulation_time,
+                 "nodes": self.accumulator.nodes,
+                 "dtype": np.dtype(self.dtype).name,
+                 "diff_nodes": nodes}
+        with open(os.path.join(state_dir, 'state.json'), 'w') as f:
+            json.dump(state, f, indent=2)
+
+    @classmethod
+    def load(cls, state_dir):
+        """
+        Returns the extraction saved in a folder with save
+        """
+        with open(os.path.join(state_dir, 'state.json')) as f:
+            state = json.load(f)
+
+        extraction = cls(state["path"], state["simulation_time"], state["nodes"], state["dtype"])
+        extraction.offset = state["offset"]
+        extraction.max_time_out = state["max_time_out"]
+        extraction.header = state["header"]
+        extraction.tail_hash = state["tail_hash"]
+        for node in state["diff_nodes"]:
+            extraction.accumulator.diff[node] = np.load(os.path.join(state_dir, 'diff_' + str(node) + '.npy'))
+        extraction.accumulator.open_jobs = pd.read_csv(os.path.join(state_dir, 'open_jobs.csv'), dtype=RESULTS_DTYPES)
+
+        return extraction
+
+
+def ts_memory_incremental(path, param, state_dir, nodes=None):
+    """
+    This functions takes as input the path of a Results.csv file the parameters the folder with the saved extraction
+    and optionally the list of nodes
+    Returns the same dataframe as ts_memory_nodes, only reading the rows added to the file since the last call
+    """
+    extraction = None
+    if os.path.exists(os.path.join(state_dir, 'state.json')):
+        extraction = IncrementalExtraction.load(state_dir)
+    if extraction is None or extraction.path != path or extraction.accumulator.nodes != nodes or \
+            np.dtype(extraction.dtype) != np.dtype(param.dtype):
+        extraction = IncrementalExtraction(path, param.simulation_time, nodes, param.dtype)
+
+    extraction.refresh(param.simulation_time)
+    extraction.save(state_dir)
+
+    return extraction.to_frame()
+
+
+def ts_memory_stream(path, param, nodes=None, chunksize=1000000):
+    """
+    This functions takes as input the path of a Results.csv file the parameters and optionally the list of nodes
+    Returns the same dataframe as ts_memory_nodes but reading the file in chunks of rows with only the needed columns,
+    so the memory used does not grow with the size of the file
+    """
+    accumulator = MemoryAccumulator(param.simulation_time, nodes, dtype=param.dtype)
+
+    for chunk in pd.read_csv(path, usecols=list(RESULTS_DTYPES), dtype=RESULTS_DTYPES, chunksize=chunksize):
+        accumulator.update(chunk)
+
+    return accumulator.to_frame()
+
+
+def add_noise(ts, jobs=None, seed=None, std=1000):
+    """
+    Takes as input a time series with the columns time and memory, optionally the jobs of the node, the seed and the
+    standard deviation of the noise
+    Returns a copy of the time series with noise added to the memory. All the noise is drawn at once from a seeded
+    generator. Without jobs the noise is different at every time-step, with the jobs of the node each job gets its own
+    noise that stays constant while the job is being executed
+    """
+    rng = np.random.default_rng(seed)
+    ts = ts.copy()
+
+    n = len(ts) if jobs is None else len(jobs)
+    noise = (rng.standard_normal(n) + std) * rng.standard_normal(n)
+
+    # The noise of each job is added to the time-steps where it is being executed
+    if jobs is not None:
+        noise = memory_sweep(jobs.assign(memory=noise), ts['time'].values)
+
+    ts['memory'] = ts['memory'] + noise
+
+    return ts
+
+
+def ts_memory_noise(df, node, param, seed=None, per_job=False):
+    """
+    This functions takes as input a dataframe a node the parameters the seed of the noise and the type of noise
+    Returns an array of time series with the used memory of the node plus noise at each time-step
+    If per_job is True the noise is constant during the execution of every job instead of changing every time-step
+    """
+    ts = ts_memory_sweep(df, node, param)
+    jobs = data_from_node(df, node) if per_job else None
+
+    return add_noise(ts, jobs, seed)
 
 def plot_ts(data, node):
     """
@@ -72,20 +512,27 @@ def plot_ts(data, node):
     plt.show()
 
 
-def univariate_data(dataset, start_index, end_index, history_size, target_size):
-    data = []
-    labels = []
+def univariate_data(dataset, start_index, end_index, history_size, target_size, dtype=None):
+    """
+    Takes as input a time series, the first and last time-steps to take samples from, the sizes of the history and
+    the target of each sample and optionally the type to convert the series to
+    Returns the (samples, history_size, 1) data and (samples, target_size, 1) labels. They are strided read-only views
+    of the series, so no sample is copied
+    """
+    values = np.asarray(dataset, dtype=dtype)
 
     start_index = start_index + history_size
     if end_index is None:
-        end_index = len(dataset) - target_size
+        end_index = len(values) - target_size
+    # With less time-steps than a sample there are no samples, the slices must not wrap around
+    end_index = max(end_index, start_index)
+
+    # Window k of the views starts at the time-step k of the series
+    data = sliding_window_view(values, history_size)[start_index - history_size:end_index - history_size]
+    labels = sliding_window_view(values, target_size)[start_index:end_index]
 
-    for i in range(start_index, end_index):
-        indices = range(i - history_size, i)
-        # Reshape data from (history_size,) to (history_size, 1)
-        data.append(np.reshape(dataset[indices[0]:indices[-1]+1].values, (history_size, 1)))
-        labels.append(np.reshape(dataset[i: i + target_size].values, (target_size, 1)))
-    return np.array(data), np.array(labels)
+    # Reshape data from (samples, history_size) to (samples, history_size, 1)
+    return data[..., np.newaxis], labels[..., np.newaxis]
 
 
 def create_time_steps(length):
@@ -122,33 +569,105 @@ def line_plot(line1, line2, label1=None, label2=None, title='Memory usage True v
 
 
 def ms_val(y_val):
-    y_val_plot = []
-    for i in range(len(y_val)):
-        if i == len(y_val) - 1:
-            for j in range(len(y_val[i])):
-                y_val_plot.append(y_val[i][j])
-        else:
-            y_val_plot.append(y_val[i][0])
-    return np.array(y_val_plot)
+    """
+    Takes as input the (samples, target_size) or (samples, target_size, 1) labels of a multi-step model
+    Returns the true series they come from, the first value of every label followed by the whole last label
+    """
+    y_val = np.asarray(y_val)
+    if len(y_val) == 0:
+        return y_val[:0, 0]
+    return np.concatenate((y_val[:-1, 0], y_val[-1]))
 
 
 def avg_pred(y_pred):
-    avg_pred = []
-    f_steps = y_pred.shape[1]
-    w = np.zeros((f_steps))
-
-    for idx, p in enumerate(y_pred):
-        w += p
-        if idx >= f_steps - 1:
-            avg_pred.append(w[0] / f_steps)
-        elif idx == len(y_pred) - 1:
-            div = f_steps
-            for j in range(len(y_pred[idx])):
-                avg_pred.append(w[j] / div)
-                div = div - 1
-        else:
-            avg_pred.append(w[0] / (idx + 1))
-        w = np.roll(w, -1)
-        w[f_steps - 1] = 0
+    """
+    Takes as input the (samples, future steps) predictions of a multi-step model
+    Returns for each time-step the average of all the predictions made for it. When there are less samples than
+    future steps the whole last prediction is averaged too, dividing by the number of steps left
+    """
+    n, f_steps = y_pred.shape
+
+    # The prediction j of the sample i is for the time-step i + j, so each time-step is an anti-diagonal of y_pred.
+    # The diagonals are added from the last step so every time-step sums its predictions from the oldest sample
+    sums = np.zeros(n + f_steps - 1)
+    for j in reversed(range(f_steps)):
+        sums[j:j + n] += y_pred[:, j]
+
+    avg_pred = sums[:n] / np.minimum(np.arange(1, n + 1), f_steps)
+    if 0 < n < f_steps:
+        avg_pred = np.concatenate((avg_pred[:n - 1], sums[n - 1:] / np.arange(f_steps, 0, -1)))
+
+    return avg_pred
+
+
+class OnlineAverager():
+    """
+    Streaming version of avg_pred for a model that makes one multi-step prediction per new time-step
+    A ring buffer of f_steps sums keeps the predictions made so far for the next time-steps, so each new prediction
+    costs O(f_steps) and nothing is allocated after the start
+    """
+
+    def __init__(self, f_steps):
+        self.f_steps = f_steps
+        self.sums = np.zeros(f_steps)
+        self.count = 0
+        self.offsets = np.arange(f_steps)
+        # Slots of the buffer of the time-steps covered by a prediction made at each slot, used by pending
+        self.slots = (self.offsets[:, np.newaxis] + self.offsets) % f_steps
+
+    def push(self, prediction):
+        """
+        Takes as input the prediction for the current time-step and the next f_steps - 1
+        Returns the average of all the predictions made for the current time-step, the same value avg_pred gives
+        """
+        slot = self.count % self.f_steps
+        # The time-steps from the slot to the end of the buffer and then from its start, added in place
+        split = self.f_steps - slot
+        self.sums[slot:] += prediction[:split]
+        self.sums[:slot] += prediction[split:]
+
+        avg = self.sums[slot] / min(self.count + 1, self.f_steps)
+
+        # The slot of the current time-step is reused for the time-step f_steps ahead
+        self.sums[slot] = 0
+        self.count += 1
+        return avg
+
+    def pending(self):
+        """
+        Returns the average of the predictions already made for each of the next f_steps - 1 time-steps
+        """
+        slots = self.slots[self.count % self.f_steps][:-1]
+        counts = np.minimum(self.count, self.f_steps - 1 - self.offsets[:-1])
+        return self.sums[slots] / np.maximum(counts, 1)
+
+
+def multivariate_data(dataset, target, start_index, end_index, history_size,
+                      target_size, step, single_step=False, dtype=np.float32):
+    """
+    Takes as input a dataframe with the features, the target series, the first and last time-steps to take samples
+    from, the sizes of the history and the target, the step between the sampled time-steps of the history and whether
+    to predict a single time-step
+    Returns the (samples, history_size / step, features) data and the (samples,) labels for single_step or
+    the (samples, target_size) labels of type dtype. The windows are strided views over the NumPy arrays, no sample is
+    copied
+    """
+    dataset = np.asarray(dataset, dtype=dtype)
+    target = np.asarray(target, dtype=dtype)
+
+    start_index = start_index + history_size
+    if end_index is None:
+        end_index = len(dataset) - target_size
+    # With less time-steps than a sample there are no samples, the slices must not wrap around
+    end_index = max(end_index, start_index)
+
+    # Window k starts at the time-step k, its shape is (features, history_size) so it is swapped to (history, features)
+    data = sliding_window_view(dataset, history_size, axis=0)[start_index - history_size:end_index - history_size]
+    data = np.swapaxes(data[:, :, ::step], 1, 2)
+
+    if single_step:
+        labels = target[start_index + target_size:end_index + target_size]
+    else:
+        labels = sliding_window_view(target, target_size)[start_index:end_index]
 
-    return np.array(avg_pred)
\ No newline at end of file
+    return data, labels
\ No newline at end of file
@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import tensorflow as tf
+
+from models import load_forecaster
+
+
+class InferenceEngine():
+    """
+    Forecasts the memory of many nodes with one trained forecaster. The latest past_history values of every node are
+    gathered in a single (nodes, history, 1) batch which goes through the model in one call, split in micro-batches of
+    at most max_batch_size windows
+
+    Requests sent with submit are queued and the ones that arrive within max_delay seconds of each other are predicted
+    together by a background thread, each request gets a Future with its forecast
+    The engine counts the requests, batches and windows predicted and the latency of the requests
+    """
+
+    def __init__(self, model, normalizer, config, max_batch_size=256, max_delay=0.005, latency_window=10000):
+        self.model = model
+        self.normalizer = normalizer
+        self.config = config
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self.history = config["past_history"]
+        self.step = config.get("step", 1)
+        self.dtype = np.dtype(config.get("dtype", "float32"))
+        target_column = config.get("target_column", 0)
+        self.mean = np.atleast_1d(normalizer.mean)[target_column]
+        self.std = np.atleast_1d(normalizer.std())[target_column]
+
+        # The model is called directly, predict has a high fixed cost per call for small batches
+        signature = [tf.TensorSpec([None, len(range(0, self.history, self.step)), 1], tf.as_dtype(self.dtype))]
+        self.predict_fn = tf.function(lambda x: model(x, training=False), input_signature=signature)
+
+        self.requests = 0
+        self.batches = 0
+        self.windows = 0
+        self.model_time = 0.0
+        self.latencies = deque(maxlen=latency_window)
+        self.start_time = time.time()
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.worker = None
+        self.running = False
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Returns an engine with the forecaster saved in path by save_forecaster
+        """
+        model, normalizer, config = load_forecaster(path)
+        return cls(model, normalizer, config, **kwargs)
+
+    def windows_from_frame(self, ts, nodes):
+        """
+        Returns the normalized (nodes, history, 1) windows of the last past_history time-steps of the "memory_<node>"
+        columns of a series like the ones of ts_memory_nodes
+        """
+        columns = ["memory_" + str(node) for node in nodes]
+        values = np.asarray(ts[columns].values[-self.history:], dtype=self.dtype)
+        return self.normalize(values.T)
+
+    def normalize(self, windows):
+        """
+        Takes as input (nodes, past_history) values in the original units
+        Returns the normalized (nodes, history, 1) windows sampled every step time-steps
+        """
+        windows = np.asarray(windows, dtype=self.dtype)[:, ::self.step]
+        windows = (windows - self.dtype.type(self.mean)) / self.dtype.type(self.std)
+        return windows[..., np.newaxis]
+
+    def predict_windows(self, windows):
+        """
+        Takes as input normalized (nodes, history, 1) windows
+        Returns the (nodes, future_target) forecasts in the original units
+        """
+        start = time.time()
+        predictions = [self.predict_fn(tf.constant(windows[i:i + self.max_batch_size])).numpy()
+                       for i in range(0, len(windows), self.max_batch_size)]
+        predictions = np.concatenate(predictions) * self.std + self.mean
+
+        # The counters are shared by the worker thread and the callers of predict_nodes
+        with self.condition:
+            self.model_time += time.time() - start
+            self.batches += len(range(0, len(windows), self.max_batch_size))
+            self.windows += len(windows)
+        return predictions
+
+    def predict_nodes(self, ts, nodes):
+        """
+        Takes as input a series with the "memory_<node>" columns and the nodes to forecast
+        Returns a dictionary with the forecast of the next future_target values of every node
+        """
+        start = time.time()
+        predictions = self.predict_windows(self.windows_from_frame(ts, nodes))
+
+        with self.condition:
+            self.requests += len(nodes)
+            self.latencies.extend([time.time() - start] * len(nodes))
+        return dict(zip(nodes, predictions))
+
+    def start(self):
+        """
+        Starts the background thread that predicts the submitted requests
+        """
+        with self.condition:
+            if self.running:
+                return self
+            self.running = True
+            self.worker = threading.Thread(target=self.serve)
+            self.worker.daemon = True
+            self.worker.start()
+        return self
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def submit(self, values):
+        """
+        Takes as input the last past_history (or more) values of a node in the original units
+        Returns a Future with its forecast, predicted in a batch with the requests that arrive close to it. A request
+        with less than past_history values gets a ValueError in its Future and is not added to the batch
+        """
+        future = Future()
+        values = np.asarray(values)
+        if values.ndim != 1 or len(values) < self.history:
+            future.set_exception(ValueError("A request needs the last %d values of the node, %s were given"
+                                            % (self.history, values.shape)))
+            return future
+
+        self.start()
+        with self.condition:
+            self.queue.append((time.time(), values[-self.history:], future))
+            self.condition.notify()
+        return future
+
+    def serve(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.running and not self.queue:
+                    return
+
+                # Wait for more requests until the batch is full or the oldest request waited max_delay seconds
+                deadline = self.queue[0][0] + self.max_delay
+                while self.running and len(self.queue) < self.max_batch_size and time.time() < deadline:
+                    self.condition.wait(deadline - time.time())
+
+                batch = [self.queue.popleft() for _ in range(min(len(self.queue), self.max_batch_size))]
+
+            try:
+                predictions = self.predict_windows(self.normalize(np.stack([values for _, values, _ in batch])))
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            end = time.time()
+            with self.condition:
+                self.requests += len(batch)
+                self.latencies.extend(end - arrival for arrival, _, _ in batch)
+            for (_, _, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+
+    def stats(self):
+        """
+        Returns the counters of the engine: requests, batches and windows predicted, time spent in the model, requests
+        per second since the engine was created and the mean, median and 99th percentile latency in seconds
+        """
+        with self.condition:
+            latencies = np.array(self.latencies)
+            elapsed = time.time() - self.start_time
+            stats = {"requests": self.requests,
+                     "batches": self.batches,
+                     "windows": self.windows,
+                     "model_time": self.model_time,
+                     "requests_per_sec": self.requests / elapsed if elapsed > 0 else 0.0,
+                     "windows_per_model_sec": self.windows / self.model_time if self.model_time > 0 else 0.0}
+        if len(latencies):
+            stats["latency_mean"] = latencies.mean()
+            stats["latency_p50"] = np.percentile(latencies, 50)
+            stats["latency_p99"] = np.percentile(latencies, 99)
+
+        return stats
+
+    def reset_stats(self):
+        with self.condition:
+            self.requests = 0
+            self.batches = 0
+            self.windows = 0
+            self.model_time = 0.0
+            self.latencies.clear()
+            self.start_time = time.time()
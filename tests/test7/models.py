@@ -0,0 +1,74 @@
+import json
+import os
+
+import numpy as np
+import tensorflow as tf
+
+from normalizer import Normalizer
+
+
+def build_lstm(past_history, future_target, features=1, step=1, units=128):
+    """
+    Returns the compiled LSTM model used in the analysis, it takes windows of past_history time-steps sampled every
+    step time-steps and predicts the next future_target values of the target
+    """
+    lstm_model = tf.keras.models.Sequential([
+        tf.keras.layers.LSTM(units, input_shape=(len(range(0, past_history, step)), features)),
+        tf.keras.layers.Dense(future_target)
+    ])
+
+    lstm_model.compile(optimizer='adam', loss='mae')
+
+    return lstm_model
+
+
+def save_forecaster(path, model, normalizer, config):
+    """
+    Saves in a folder everything needed to forecast without training again: the trained model, the normalizer fitted on
+    its training data and the window config (past_history, future_target, step, features, target_column, ...)
+    """
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    model.save(os.path.join(path, 'model.h5'))
+    normalizer.save(os.path.join(path, 'normalizer.json'))
+    with open(os.path.join(path, 'config.json'), 'w') as f:
+        json.dump(config, f, indent=2)
+
+
+def load_forecaster(path):
+    """
+    Returns the model, the normalizer and the window config saved with save_forecaster
+    """
+    model = tf.keras.models.load_model(os.path.join(path, 'model.h5'), compile=False)
+    normalizer = Normalizer.load(os.path.join(path, 'normalizer.json'))
+    with open(os.path.join(path, 'config.json')) as f:
+        config = json.load(f)
+
+    return model, normalizer, config
+
+
+def last_window(series, normalizer, config):
+    """
+    Takes as input a (time-steps,) or (time-steps, features) series in the original units
+    Returns the normalized (1, history, features) window of its last past_history time-steps, ready for the model
+    """
+    window = np.asarray(series[-config["past_history"]:], dtype=config.get("dtype", "float32"))
+    window = normalizer.transform(window)[::config.get("step", 1)]
+    if window.ndim == 1:
+        window = window[:, np.newaxis]
+
+    return window[np.newaxis]
+
+
+def forecast(model, normalizer, config, series):
+    """
+    Takes as input the loaded forecaster and a series in the original units
+    Returns the next future_target values of the target predicted from the end of the series, in the original units
+    """
+    prediction = model.predict(last_window(series, normalizer, config))[0]
+
+    target_column = config.get("target_column", 0)
+    mean = np.atleast_1d(normalizer.mean)[target_column]
+    std = np.atleast_1d(normalizer.std())[target_column]
+    return prediction * std + mean
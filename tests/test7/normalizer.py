@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+
+
+class Normalizer():
+    """
+    Mean and standard deviation of every feature of a time series, used to normalize the data of the models
+    The statistics are computed in one streaming pass over chunks of the data with the Welford/Chan update, so memory-
+    mapped series of any length can be fitted. They can be saved next to the model and loaded to normalize new data
+    without reading the training series again
+    """
+
+    def __init__(self, ddof=1):
+        self.ddof = ddof
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+
+    def partial_fit(self, values):
+        """
+        Updates the statistics with a chunk of (time-steps,) or (time-steps, features) values
+        """
+        values = np.asarray(values, dtype=np.float64)
+        count = len(values)
+        if count == 0:
+            return self
+
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+
+        if self.count == 0:
+            self.mean = mean
+            self.m2 = m2
+        else:
+            total = self.count + count
+            delta = mean - self.mean
+            self.mean = self.mean + delta * count / total
+            self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / total
+        self.count += count
+
+        return self
+
+    def fit(self, values, chunksize=1000000):
+        """
+        Computes the statistics of the values reading them in chunks of time-steps, for example the train split of the
+        values of a SeriesStore
+        """
+        self.count = 0
+        for start in range(0, len(values), chunksize):
+            self.partial_fit(values[start:start + chunksize])
+        return self
+
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - self.ddof))
+
+    def transform(self, values, inplace=False):
+        """
+        Returns the normalized values, with inplace the array passed is overwritten instead of copied
+        A copy of integer values, like the raw memory columns, is made of a float type
+        """
+        if not inplace:
+            values = np.asarray(values)
+            values = np.array(values, dtype=np.result_type(values, np.float32))
+        values -= self.mean.astype(values.dtype)
+        values /= self.std().astype(values.dtype)
+        return values
+
+    def inverse_transform(self, values):
+        """
+        Returns the values in the original units, for example the predictions of a model
+        """
+        return np.asarray(values) * self.std() + self.mean
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({"ddof": self.ddof,
+                       "count": self.count,
+                       "mean": np.atleast_1d(self.mean).tolist(),
+                       "m2": np.atleast_1d(self.m2).tolist(),
+                       "scalar": np.ndim(self.mean) == 0}, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            stats = json.load(f)
+
+        normalizer = cls(stats["ddof"])
+        normalizer.count = stats["count"]
+        normalizer.mean = np.array(stats["mean"])
+        normalizer.m2 = np.array(stats["m2"])
+        if stats["scalar"]:
+            normalizer.mean = normalizer.mean[0]
+            normalizer.m2 = normalizer.m2[0]
+
+        return normalizer
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+
+def node_capacity(topology):
+    """
+    Takes as input the topology dictionary of create_json_topology
+    Returns a dictionary with the RAM of every node
+    """
+    return {entity["id"]: entity["RAM"] for entity in topology["entity"]}
+
+
+def debounced(above, debounce):
+    """
+    Returns where the (time-steps, nodes) condition has been true for the last debounce time-steps
+    """
+    if debounce <= 1:
+        return above
+    runs = np.cumsum(above, axis=0, dtype=np.int64)
+    runs[debounce:] -= runs[:-debounce].copy()
+    steady = runs == debounce
+    steady[:debounce - 1] = False
+    return steady
+
+
+def hysteresis_state(above, below):
+    """
+    Takes as input where the (time-steps, nodes) series is over the high threshold and where it is under the low one
+    Returns the state of the alarm: it turns on when the series goes over the high threshold and only turns off when it
+    goes under the low one. For each time-step the last time-step that was over or under is found with a cumulative
+    maximum of its index, so the state is computed without a loop over time
+    """
+    steps = np.arange(len(above))[:, np.newaxis]
+    last = np.maximum.accumulate(np.where(above | below, steps, -1), axis=0)
+    state = np.take_along_axis(above, np.maximum(last, 0), axis=0)
+    return state & (last >= 0)
+
+
+def known_averages(forecasts):
+    """
+    Takes as input (samples, horizon, nodes) multi-step predictions
+    Returns for every sample t the average of the predictions made until t for each of the time-steps t to
+    t + horizon - 1, the sample t - d predicted the time-step t + k as its step k + d. It is the value OnlineAverager
+    returns for t and its pending averages, for all the samples at once
+    """
+    samples, horizon = forecasts.shape[:2]
+    sums = np.zeros_like(forecasts)
+    counts = np.zeros((samples, horizon, 1))
+    for k in range(horizon):
+        for d in range(horizon - k):
+            sums[d:, k] += forecasts[:samples - d, k + d]
+            counts[d:, k] += 1
+    return sums / counts
+
+
+def onsets(state):
+    """
+    Returns the time-steps where the (time-steps, nodes) state turns on
+    """
+    start = state.copy()
+    start[1:] &= ~state[:-1]
+    return start
+
+
+class OverloadDetector():
+    """
+    Detects in advance when the memory of the nodes goes over a fraction level of their RAM
+    The forecasts of all the nodes and horizons are checked at once. An alarm starts when the predictions known at a
+    time-step give a crossing in the next lead_time time-steps for debounce time-steps in a row, and it stops when the
+    forecasts go under the threshold minus hysteresis times the RAM, so a forecast that oscillates around the
+    threshold gives a single alarm
+    The real crossings are found in the series with the same hysteresis and debounce
+    """
+
+    def __init__(self, capacity, nodes, level=0.9, lead_time=5, hysteresis=0.05, debounce=1):
+        self.nodes = list(nodes)
+        self.capacity = np.array([capacity[node] for node in self.nodes], dtype=np.float64)
+        self.lead_time = lead_time
+        self.debounce = debounce
+        self.high = level * self.capacity
+        self.low = (level - hysteresis) * self.capacity
+
+    def predicted_peak(self, forecasts, averaged=False):
+        """
+        Takes as input the (samples, horizon, nodes) multi-step predictions of the nodes, the sample t predicts the
+        time-steps t to t + horizon - 1 from the time-steps before t
+        Returns the (time-steps, nodes) maximum forecast of the time-steps t to t + lead_time - 1 known at every
+        time-step t. With averaged every time-step uses the average of all the predictions made for it until t, as
+        OnlineAverager gives, instead of only the prediction of the sample t
+
+        The output of avg_pred can not be used: the average of a time-step includes the predictions made at the
+        following time-steps, so an alarm would use samples that are not known yet when it is raised
+        """
+        forecasts = np.asarray(forecasts, dtype=np.float64)
+        if forecasts.ndim != 3:
+            raise ValueError("The forecasts must be the (samples, horizon, nodes) predictions made at every "
+                             "time-step, the averages of avg_pred use predictions made after the time-step")
+        if self.lead_time > forecasts.shape[1]:
+            raise ValueError("The lead time can not be longer than the horizon of the predictions")
+
+        if averaged:
+            forecasts = known_averages(forecasts)
+        return forecasts[:, :self.lead_time].max(axis=1)
+
+    def state(self, values):
+        """
+        Returns the (time-steps, nodes) state of the alarms of a series with hysteresis and debounce
+        """
+        above = debounced(values >= self.high, self.debounce)
+        below = values < self.low
+        return hysteresis_state(above, below)
+
+    def alarms(self, forecasts, averaged=False):
+        """
+        Returns the (time-steps, nodes) time-steps where an alarm starts
+        """
+        return onsets(self.state(self.predicted_peak(forecasts, averaged)))
+
+    def crossings(self, values):
+        """
+        Returns the (time-steps, nodes) time-steps where the real (time-steps, nodes) memory goes over the threshold
+        """
+        return onsets(self.state(np.asarray(values, dtype=np.float64)))
+
+    def evaluate(self, forecasts, values, tolerance=0, averaged=False):
+        """
+        Takes as input the multi-step predictions and the (time-steps, nodes) real memory of the nodes, the sample t of
+        the predictions and the time-step t of the memory are the same time, as the labels of ms_val
+        Returns a dataframe with the alarms, real crossings, precision, recall and mean time in advance of every node
+        and of all of them. An alarm raised at t is right when a crossing starts from t to t + lead_time - 1 +
+        tolerance, and a crossing is detected when an alarm started in that many time-steps before it
+        """
+        alarms = self.alarms(forecasts, averaged)
+        crossings = self.crossings(values)
+        steps = min(len(alarms), len(crossings))
+        window = self.lead_time - 1 + tolerance
+
+        rows = []
+        for i, node in enumerate(self.nodes):
+            alarm_steps = np.flatnonzero(alarms[:steps, i])
+            crossing_steps = np.flatnonzero(crossings[:steps, i])
+
+            # First crossing at or after every alarm
+            next_crossing = np.searchsorted(crossing_steps, alarm_steps)
+            right = next_crossing < len(crossing_steps)
+            right[right] = crossing_steps[next_crossing[right]] - alarm_steps[right] <= window
+
+            # Last alarm at or before every crossing
+            last_alarm = np.searchsorted(alarm_steps, crossing_steps, side='right') - 1
+            detected = last_alarm >= 0
+            detected[detected] = crossing_steps[detected] - alarm_steps[last_alarm[detected]] <= window
+            advance = crossing_steps[detected] - alarm_steps[last_alarm[detected]]
+
+            rows.append({"node": node,
+                         "alarms": len(alarm_steps),
+                         "crossings": len(crossing_steps),
+                         "true_positives": int(right.sum()),
+                         "detected": int(detected.sum()),
+                         "advance": advance.mean() if len(advance) else np.nan})
+
+        results = pd.DataFrame(rows)
+        total = {column: int(results[column].sum()) for column in ["alarms", "crossings", "true_positives", "detected"]}
+        total["node"] = "all"
+        total["advance"] = np.average(results["advance"].fillna(0), weights=results["detected"]) \
+            if total["detected"] else np.nan
+        results = pd.DataFrame(rows + [total])
+
+        results["precision"] = results["true_positives"] / results["alarms"].replace(0, np.nan)
+        results["recall"] = results["detected"] / results["crossings"].replace(0, np.nan)
+        return results
@@ -2,4 +2,7 @@ class Parameters():
 
     def __init__(self):
 
-        self.simulation_time = 1000000
\ No newline at end of file
+        self.simulation_time = 1000000
+
+        # Type of the floats of the time-series, the normalized data and the windows used to train the models
+        self.dtype = 'float32'
\ No newline at end of file
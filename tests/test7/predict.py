@@ -0,0 +1,29 @@
+import os
+import sys
+
+from parameters import Parameters
+from cache import cached_memory_store
+from store import SeriesStore
+from models import load_forecaster, forecast
+
+# Predict the next memory usage of a node with the model trained and saved by analysis.py, without training
+# The series is read from the SeriesStore passed as argument, kept up to date with SeriesStore.append, or else from
+# the store the model was trained on. Only when there is none it is extracted from Results.csv
+param = Parameters()
+node = 3
+
+lstm_model, normalizer, config = load_forecaster('forecaster_' + str(node))
+
+series_path = sys.argv[1] if len(sys.argv) > 1 else config.get("series")
+if series_path is not None and os.path.exists(os.path.join(series_path, 'meta.json')):
+    store = SeriesStore(series_path)
+else:
+    store = cached_memory_store("Results.csv", param, [config["node"]])
+
+# Only the last past_history time-steps of the memory-mapped series are read
+ts = store[-config["past_history"]:]
+
+y_pred = forecast(lstm_model, normalizer, config, ts[config["features"]].values)
+
+print("Memory of node %d in the next %d time-steps:" % (config["node"], config["future_target"]))
+print(y_pred)
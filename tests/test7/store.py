@@ -0,0 +1,280 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Files written by the YAFS simulation for each type of record
+RESULTS_FILES = {"COMP_M": "Results.csv", "LINK": "Results_link.csv"}
+
+# Type of each column in the store, the columns not listed here are text and are stored as category codes
+STORE_DTYPES = {"id": np.int64, "DES.src": np.int32, "DES.dst": np.int32, "TOPO.src": np.int32,
+                "TOPO.dst": np.int32, "service": np.float64, "time_in": np.float64, "time_out": np.float64,
+                "time_emit": np.float64, "time_reception": np.float64, "memory": np.float32,
+                "src": np.int32, "dst": np.int32, "latency": np.float64, "ctime": np.float64,
+                "size": np.int64, "buffer": np.int32}
+
+
+def count_rows(path):
+    """
+    Returns the number of records in a csv file, that is the number of lines without the header
+    """
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+
+    # The last line may have no end of line
+    if last != b'\n':
+        lines += 1
+    return lines - 1
+
+
+def truncate_npy(path, rows, chunksize=1000000):
+    """
+    Keeps only the first rows of a 1-D .npy file, the rows are copied in chunks to a new file that replaces it
+    Returns the new memory-mapped array
+    """
+    old = np.load(path, mmap_mode='r')
+    new = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=old.dtype, shape=(rows,))
+    for start in range(0, rows, chunksize):
+        new[start:start + chunksize] = old[start:min(start + chunksize, rows)]
+    new.flush()
+
+    del old, new
+    os.replace(path + '.tmp', path)
+    return np.load(path, mmap_mode='r')
+
+
+def convert_results(results_dir='.', store_dir='Results_store', chunksize=1000000):
+    """
+    Takes as input the folder with the Results.csv and Results_link.csv files of a simulation and the folder of the store
+    Writes every column of the COMP_M and LINK records as a typed .npy file in <store_dir>/<type>/ plus a meta.json
+    with the columns, the number of rows and the categories of the text columns. The csv files are read in chunks so
+    any size of file can be converted. Columns missing in a file, as memory in test1 to test3, are just not stored
+    """
+    for kind, file_name in RESULTS_FILES.items():
+        path = os.path.join(results_dir, file_name)
+        if not os.path.exists(path):
+            continue
+
+        kind_dir = os.path.join(store_dir, kind)
+        if not os.path.exists(kind_dir):
+            os.makedirs(kind_dir)
+
+        n_rows = count_rows(path)
+        columns = list(pd.read_csv(path, nrows=0).columns)
+        text_columns = [column for column in columns if column not in STORE_DTYPES]
+        dtypes = {column: np.int32 if column in text_columns else STORE_DTYPES[column] for column in columns}
+        categories = {column: {} for column in text_columns}
+
+        arrays = {column: np.lib.format.open_memmap(os.path.join(kind_dir, column + '.npy'), mode='w+',
+                                                     dtype=dtypes[column], shape=(n_rows,))
+                  for column in columns}
+
+        start = 0
+        read_dtypes = {column: str for column in text_columns}
+        for chunk in pd.read_csv(path, dtype=read_dtypes, chunksize=chunksize):
+            # The last row of an interrupted simulation can be incomplete and its missing values can not be stored
+            # in the integer columns, so rows with missing values are dropped
+            chunk = chunk.dropna()
+            end = start + len(chunk)
+            for column in columns:
+                values = chunk[column].values
+                if column in categories:
+                    # Codes of the chunk are mapped to the codes of the whole file, in order of first appearance
+                    codes = categories[column]
+                    chunk_codes, uniques = pd.factorize(values)
+                    mapping = np.array([codes.setdefault(value, len(codes)) for value in uniques], dtype=np.int32)
+                    values = mapping[chunk_codes]
+                arrays[column][start:end] = values
+            start = end
+
+        for column in columns:
+            arrays[column].flush()
+            if start < n_rows:
+                arrays[column] = truncate_npy(os.path.join(kind_dir, column + '.npy'), start)
+
+        meta = {"rows": start,
+                "columns": columns,
+                "dtypes": {column: np.dtype(dtypes[column]).name for column in columns},
+                "categories": {column: list(codes) for column, codes in categories.items()}}
+        with open(os.path.join(kind_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+
+class ResultsStore():
+    """
+    Read access to the records of a simulation converted with convert_results
+    The columns are memory-mapped, so a query only reads from disk the columns it uses and the rows it returns
+    """
+
+    def __init__(self, store_dir='Results_store', kind="COMP_M"):
+        self.path = os.path.join(store_dir, kind)
+        with open(os.path.join(self.path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta["columns"]
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def column(self, name):
+        """
+        Returns the memory-mapped array of a column, text columns are returned as their category codes
+        """
+        if name not in self._columns:
+            if name not in self.columns:
+                raise KeyError("Column " + name + " is not in the store " + self.path)
+            self._columns[name] = np.load(os.path.join(self.path, name + '.npy'), mmap_mode='r')
+        return self._columns[name]
+
+    def to_frame(self, columns=None, rows=None):
+        """
+        Takes as input the columns to load and optionally the indices or mask of the rows to load
+        Returns a dataframe with these columns, text columns are decoded as categoricals
+        """
+        if columns is None:
+            columns = self.columns
+
+        data = {}
+        for name in columns:
+            values = self.column(name)
+            values = np.asarray(values) if rows is None else values[rows]
+            if name in self.meta["categories"]:
+                values = pd.Categorical.from_codes(values, self.meta["categories"][name])
+            data[name] = values
+
+        return pd.DataFrame(data, columns=columns)
+
+    def data_from_node(self, node, columns=None):
+        """
+        Same as functions.data_from_node but only reading the TOPO.dst column and the selected columns of its rows
+        """
+        rows = np.flatnonzero(self.column('TOPO.dst') == node)
+        return self.to_frame(columns, rows)
+
+    def filter_time(self, time, columns=None):
+        """
+        Same as functions.filter_time, returns the records that were being executed at the passed time
+        """
+        time_in = self.column('time_in')
+        time_out = self.column('time_out')
+        rows = np.flatnonzero((time_in < time) & (time < time_out))
+        return self.to_frame(columns, rows)
+
+
+def file_hash(path):
+    """
+    Returns the sha256 hash of the content of a file, read in blocks so big files do not need to fit in memory
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def save_series(ts, path, nodes=None, resolution=1, source=None, source_hash=None):
+    """
+    Takes as input a time series dataframe with a time column, the folder of the store, optionally the nodes of the
+    columns, the seconds between time-steps and the Results.csv file the series was extracted from and its hash
+    Writes the series as a binary file of the type of its columns that can be memory-mapped plus a meta.json sidecar
+    and returns the store
+    """
+    if not os.path.exists(path):
+        os.makedirs(path)
+    if source is not None and source_hash is None:
+        source_hash = file_hash(source)
+
+    columns = [column for column in ts.columns if column != "time"]
+    meta = {"columns": columns,
+            "dtype": np.result_type(*ts[columns].dtypes).name if columns else 'float32',
+            "nodes": [int(node) for node in nodes] if nodes is not None else None,
+            "rows": 0,
+            "start_time": float(ts["time"].values[0]) if len(ts) else 0.0,
+            "resolution": resolution,
+            "source": source,
+            "source_hash": source_hash,
+            "mean": None,
+            "std": None}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    open(os.path.join(path, 'series.bin'), 'wb').close()
+
+    store = SeriesStore(path)
+    store.append(ts)
+    return store
+
+
+class SeriesStore():
+    """
+    Time series saved with save_series
+    The values are memory-mapped, so slicing the store only reads from disk the time-steps that are used
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta["columns"]
+        self.dtype = np.dtype(self.meta["dtype"])
+        self._values = None
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def values(self):
+        """
+        Returns the memory-mapped (time-steps, columns) array of the series
+        """
+        if self._values is None:
+            self._values = np.memmap(os.path.join(self.path, 'series.bin'), dtype=self.dtype, mode='r',
+                                     shape=(len(self), len(self.columns)))
+        return self._values
+
+    def time(self):
+        """
+        Returns the time of every time-step of the series
+        """
+        return self.meta["start_time"] + np.arange(len(self)) * self.meta["resolution"]
+
+    def __getitem__(self, item):
+        """
+        Returns a dataframe with the time and the columns of the time-steps selected by a slice
+        """
+        if len(self) == 0:
+            return pd.DataFrame(columns=["time"] + self.columns)
+
+        steps = np.asarray(range(len(self))[item])
+        ts = pd.DataFrame(np.array(self.values()[item]), columns=self.columns)
+        ts.insert(0, "time", self.meta["start_time"] + steps * self.meta["resolution"])
+        return ts
+
+    def append(self, ts):
+        """
+        Adds the time-steps of a dataframe with the same columns at the end of the series
+        """
+        values = np.ascontiguousarray(ts[self.columns].values, dtype=self.dtype)
+        with open(os.path.join(self.path, 'series.bin'), 'ab') as f:
+            values.tofile(f)
+
+        self.meta["rows"] += len(values)
+        self._values = None
+        self.save_meta()
+
+    def set_stats(self, mean, std):
+        """
+        Saves the normalization statistics of the columns in the metadata
+        """
+        self.meta["mean"] = [float(value) for value in np.atleast_1d(mean)]
+        self.meta["std"] = [float(value) for value in np.atleast_1d(std)]
+        self.save_meta()
+
+    def save_meta(self):
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=2)
@@ -0,0 +1,130 @@
+import numpy as np
+import tensorflow as tf
+
+from models import load_forecaster
+
+
+def sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1)
+
+
+class StreamingLSTM():
+    """
+    Runs a trained LSTM forecaster over a stream of samples of many nodes, one sample per node at a time
+    The weights of the LSTM and Dense layers are copied to NumPy arrays and the hidden and cell states of every node are
+    kept between samples, so each new sample advances the states by a single LSTM step instead of running the whole
+    past_history window through the model again. The states of all the nodes are advanced with one matrix product
+
+    The model was trained on windows that start from zero states, while the streaming states carry the whole past of
+    the node. The forecast is the one of the windowed model only at exactly past_history samples after a reset, when
+    the states have seen the same samples as its window. After that the states keep the samples that left the window,
+    so the forecasts drift from the windowed ones, less the more the model forgets old samples. Call reset, or
+    warm_up with the last past_history samples, to get the windowed forecast again
+    """
+
+    def __init__(self, model, normalizer, config, nodes, dtype=np.float32):
+        if config.get("step", 1) != 1:
+            raise ValueError("Streaming needs a model trained on windows with step 1")
+
+        lstm = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.LSTM)][0]
+        dense = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)][-1]
+        kernel, recurrent_kernel, bias = lstm.get_weights()
+        dense_kernel, dense_bias = dense.get_weights()
+
+        self.dtype = np.dtype(dtype)
+        self.units = recurrent_kernel.shape[0]
+        self.kernel = kernel.astype(self.dtype)
+        self.recurrent_kernel = recurrent_kernel.astype(self.dtype)
+        self.bias = bias.astype(self.dtype)
+        self.dense_kernel = dense_kernel.astype(self.dtype)
+        self.dense_bias = dense_bias.astype(self.dtype)
+
+        target_column = config.get("target_column", 0)
+        self.mean = np.atleast_1d(normalizer.mean)[target_column]
+        self.std = np.atleast_1d(normalizer.std())[target_column]
+        self.config = config
+
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.reset()
+
+    @classmethod
+    def load(cls, path, nodes, **kwargs):
+        """
+        Returns the streaming runner of the forecaster saved in path by save_forecaster
+        """
+        model, normalizer, config = load_forecaster(path)
+        return cls(model, normalizer, config, nodes, **kwargs)
+
+    def reset(self, nodes=None):
+        """
+        Sets the states of the nodes, or of all of them, back to zero
+        """
+        if nodes is None:
+            self.h = np.zeros((len(self.nodes), self.units), dtype=self.dtype)
+            self.c = np.zeros((len(self.nodes), self.units), dtype=self.dtype)
+            self.samples = np.zeros(len(self.nodes), dtype=np.int64)
+        else:
+            rows = [self.index[node] for node in nodes]
+            self.h[rows] = 0
+            self.c[rows] = 0
+            self.samples[rows] = 0
+
+    def step(self, values, rows=None):
+        """
+        Advances the states of the rows (all the nodes by default) with their next normalized (rows, features) values
+        """
+        if rows is None:
+            h, c = self.h, self.c
+        else:
+            h, c = self.h[rows], self.c[rows]
+
+        z = values @ self.kernel + h @ self.recurrent_kernel + self.bias
+        i, f, g, o = np.split(z, 4, axis=1)
+        c = sigmoid(f) * c + sigmoid(i) * np.tanh(g)
+        h = sigmoid(o) * np.tanh(c)
+
+        if rows is None:
+            self.h, self.c = h, c
+            self.samples += 1
+        else:
+            self.h[rows], self.c[rows] = h, c
+            self.samples[rows] += 1
+
+    def forecast(self, rows=None):
+        """
+        Returns the (rows, future_target) forecasts of the current states in the original units
+        """
+        h = self.h if rows is None else self.h[rows]
+        return (h @ self.dense_kernel + self.dense_bias) * self.std + self.mean
+
+    def update(self, values, nodes=None):
+        """
+        Takes as input the new sample in the original units of every node, or of the nodes passed
+        Returns the (nodes, future_target) forecasts of the next values after the sample
+        """
+        rows = None if nodes is None else [self.index[node] for node in nodes]
+        values = (np.asarray(values, dtype=self.dtype).reshape(-1, 1) - self.dtype.type(self.mean)) \
+            / self.dtype.type(self.std)
+        self.step(values, rows)
+        return self.forecast(rows)
+
+    def warm_up(self, history):
+        """
+        Starts the states of all the nodes from zero and runs them over a (time-steps, nodes) history in the original
+        units, for example the last past_history time-steps of the "memory_<node>" columns of ts_memory_nodes
+        Returns the forecasts after the last time-step
+        """
+        self.reset()
+        history = np.asarray(history, dtype=self.dtype)
+        for values in history:
+            self.update(values)
+        return self.forecast()
+
+    def ready(self):
+        """
+        Returns for every node whether it has received at least past_history samples since its last reset, so its
+        forecast is no longer based on a partial window. Only at exactly past_history samples it is the same as the
+        forecast of the windowed model, later ones include older samples
+        """
+        return self.samples >= self.config["past_history"]
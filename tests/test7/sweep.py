@@ -0,0 +1,128 @@
+import itertools
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from parameters import Parameters
+from cache import cached_memory_store
+from store import SeriesStore
+from normalizer import Normalizer
+
+# Grid of the hyperparameters of the LSTM of analysis.py, every combination is trained and evaluated
+GRID = {"past_history": [75, 150, 300],
+        "future_target": [5],
+        "units": [32, 64, 128],
+        "batch_size": [100, 256],
+        "epochs": [10]}
+
+node = 3
+TRAIN_SPLIT = 0.7
+EVALUATION_INTERVAL = 200
+VALIDATION_STEPS = 50
+
+# Each worker trains one configuration at a time with THREADS threads, so WORKERS * THREADS should not be more than
+# the number of cores
+THREADS = 2
+WORKERS = max(1, multiprocessing.cpu_count() // THREADS)
+
+
+def configurations(grid):
+    """
+    Returns the list of dictionaries with every combination of the values of the grid
+    """
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*[grid[key] for key in keys])]
+
+
+def init_worker(threads):
+    """
+    Limits the threads TensorFlow uses in a worker, it has to run before TensorFlow is used in the process
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def train_configuration(task):
+    """
+    Trains and evaluates one configuration in a worker. The series is the memory-mapped SeriesStore shared by all the
+    workers, the windows are gathered from it and normalized with the statistics of the train split by window_dataset
+    Returns the row of the results table of the configuration
+    """
+    import tensorflow as tf
+    from models import build_lstm
+    from pipeline import window_dataset
+
+    config, store_path, column, train_split, mean, std, dtype = task
+    series = SeriesStore(store_path).values()[:, column]
+
+    start = time.time()
+    tf.random.set_seed(13)
+    train = window_dataset(series, 0, train_split, config["past_history"], config["future_target"],
+                           batch_size=config["batch_size"], shuffle_buffer=10000, seed=13, mean=mean, std=std,
+                           dtype=dtype, repeat=True)
+    val = window_dataset(series, train_split, None, config["past_history"], config["future_target"],
+                         batch_size=config["batch_size"], mean=mean, std=std, dtype=dtype, repeat=True)
+
+    model = build_lstm(config["past_history"], config["future_target"], units=config["units"])
+    history = model.fit(train, epochs=config["epochs"], steps_per_epoch=EVALUATION_INTERVAL,
+                        validation_data=val, validation_steps=VALIDATION_STEPS, verbose=0)
+    train_time = time.time() - start
+
+    start = time.time()
+    val_mae = model.evaluate(val, steps=VALIDATION_STEPS, verbose=0)
+    eval_time = time.time() - start
+
+    row = dict(config)
+    row.update({"train_mae": history.history["loss"][-1],
+                "val_mae": val_mae,
+                "val_mae_memory": val_mae * std,
+                "train_time": train_time,
+                "eval_time": eval_time,
+                "pid": os.getpid()})
+    return row
+
+
+def run_sweep(grid, store, column, train_split, normalizer, dtype, workers=WORKERS, threads=THREADS):
+    """
+    Trains every configuration of the grid in a pool of workers with the series of a SeriesStore
+    Returns the results table sorted by the validation error
+    """
+    mean = float(np.atleast_1d(normalizer.mean)[0])
+    std = float(np.atleast_1d(normalizer.std())[0])
+    tasks = [(config, store.path, column, train_split, mean, std, dtype) for config in configurations(grid)]
+
+    rows = []
+    start = time.time()
+    # TensorFlow can not be used in a forked process once it is loaded, the workers are started as new interpreters
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=init_worker, initargs=(threads,)) as pool:
+        for row in pool.imap_unordered(train_configuration, tasks):
+            rows.append(row)
+            print("%d/%d %s: val MAE %.4f in %.1f s" % (len(rows), len(tasks),
+                                                        {key: row[key] for key in grid}, row["val_mae"],
+                                                        row["train_time"]))
+
+    print("Sweep of %d configurations in %.1f s" % (len(tasks), time.time() - start))
+    return pd.DataFrame(rows).sort_values("val_mae").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    param = Parameters()
+
+    # The series is extracted once and shared by the workers through the cache
+    store = cached_memory_store("Results.csv", param, [node])
+    column = store.columns.index("memory_" + str(node))
+    train_split = int(TRAIN_SPLIT * len(store))
+    normalizer = Normalizer().fit(store.values()[:train_split, column])
+    store.set_stats(normalizer.mean, normalizer.std())
+
+    results = run_sweep(GRID, store, column, train_split, normalizer, param.dtype)
+    results.to_csv("sweep.csv", index=False)
+    print(results)